@@ -5,11 +5,13 @@ from pathlib import Path
 
 from aurkonsult import _
 from aurkonsult import Configuration
-from aurkonsult.gui import run
-from aurkonsult.gui import ICONS
+from aurkonsult import database, query
 
 
 if __name__ == "__main__":
+    # not at top: parser processes (spawn) import this module, without PyQt5
+    from aurkonsult.gui import run
+    from aurkonsult.gui import ICONS
 
     config = Configuration()
 
@@ -23,6 +25,8 @@ if __name__ == "__main__":
             extend += " --history"
         if "--pamac" in sys.argv:
             extend += " --pamac"
+        if "--lazy" in sys.argv:
+            extend += " --lazy"
         content = (
             "[Desktop Entry]\n"
             "Name=aurKonsult\n"
@@ -43,13 +47,17 @@ if __name__ == "__main__":
             "   -r         : remove all config files in $HOME\n"
             "   --ext      : load extended Aur Database\n"
             "   --mini     : for test, load only 100 aur packages\n"
+            "   --lazy     : fast start, package details are read only if displayed\n"
+            "   --jobs=N   : processes for read database, 1: only one (default: cpu count)\n"
             "   --comments : load comment dates from aur page\n"
             "   --history  : can load history dates/titles from aur repo\n"
             "   --pamac    : use pamac cli for install package\n"
+            '   --query="" : print packages found, without gui, ex: --query="votes>100 modified<30d"\n'
             "\n"
             f"Load:  {config.url}\n"
             f"Save Database in : {config.db_file}\n"
             f"Save prev update time in : {config.db_time}\n"
+            f"Save http validators in : {config.db_meta}\n"
             "\n"
             "create gui launcher example:\n"
             f" {Configuration.PKGNAME} -i --ext --history : create .desktop for use extended database and can load aur history \n"
@@ -63,8 +71,25 @@ if __name__ == "__main__":
             missing_ok=True
         )
         config.db_file.unlink(missing_ok=True)
+        config.db_snapshot.unlink(missing_ok=True)
         config.db_time.unlink(missing_ok=True)
+        config.db_meta.unlink(missing_ok=True)
         config.LOGO_FILE.unlink(missing_ok=True)
         exit(0)
+    if texts := [arg[8:] for arg in sys.argv if arg.startswith("--query=")]:
+        try:
+            search = query.parse(texts[0])
+        except ValueError as err:
+            print(err)
+            exit(2)
+        if not config.db_file.exists():
+            print(f"Database not found: {config.db_file}, run gui for download")
+            exit(3)
+        packages = database.load_packages(
+            config.db_file, config.db_snapshot, config.user_aurs, jobs=config.jobs
+        )
+        for pkg in search.select(packages):
+            print(f"{pkg.name} {pkg.version}\n    {pkg.description}")
+        exit(0)
 
     run(config)
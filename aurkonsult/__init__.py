@@ -2,4 +2,12 @@ from .i18n import _, set_lang
 from .config import UserConf, Configuration
 from .core import Package, vercmp
 #import api
-from .gui import models
+
+
+def __getattr__(name: str):
+    """gui is imported only if used: parser processes not load PyQt5"""
+    if name == "models":
+        from .gui import models
+
+        return models
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
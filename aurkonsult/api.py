@@ -3,14 +3,44 @@ interface with AUR
 """
 import os
 import time
-import datetime
+import json
 from pathlib import Path
+from typing import Callable
 from urllib import request, error
 import gzip
 import platform
+import zlib
 from .config import Configuration
 
 
+CHUNK_SIZE = 256 * 1024  # uncompressed bytes written by loop
+
+
+class _ProgressReader:
+    """file-like wrapper, count compressed bytes read from network"""
+
+    def __init__(self, fileobj, total: int, progress=None) -> None:
+        self.fileobj = fileobj
+        self.total = total
+        self.progress = progress
+        self.count = 0
+        self.start = time.monotonic()
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.fileobj.read(size)
+        self.count += len(chunk)
+        return chunk
+
+    def speed(self) -> float:
+        """bytes by second"""
+        elapsed = time.monotonic() - self.start
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def notify(self):
+        if self.progress:
+            self.progress(self.count, self.total, self.speed())
+
+
 def _get_user_agent() -> str:
     """http signature"""
     uname = platform.uname()
@@ -20,81 +50,73 @@ def _get_user_agent() -> str:
     )
 
 
-def convert_header_date(header: str) -> datetime.datetime:
-    """http header `Wed, 24 Nov 2021 21:36:46 GMT` to datetime"""
-    months = {
-        "Jan": "01",
-        "Feb": "02",
-        "Mar": "03",
-        "Apr": "04",
-        "May": "05",
-        "Jun": "06",
-        "Jul": "07",
-        "Aug": "08",
-        "Sep": "09",
-        "Oct": "10",
-        "Nov": "11",
-        "Dec": "12",
-    }
-    headers = header.split(" ")[1:]
+def load_validators(meta_file: Path) -> dict[str, str]:
+    """http cache validators (ETag, Last-Modified) saved with the last download"""
     try:
-        headers[1] = months[headers[1]]
-        header = " ".join(headers)
-    except KeyError:
-        header = "24 11 2020 21:00:00 GMT"
-        # return datetime.datetime.now()
-    return datetime.datetime.strptime(header, "%d %m %Y %H:%M:%S %Z")
-
-
-def download(file_name: Path, url: str, time_file: Path) -> int:
-    """download aur database in /tmp/"""
-    print(file_name)
-    modified_since = ""
-    # check_time = True
-    dt_last_update = datetime.datetime.utcnow()
-    if file_name.exists():
-        # check_time = False
-        last_update = file_name.stat().st_mtime
-        dt_last_update = datetime.datetime(*time.gmtime(last_update)[:6])
-        print("dt_last_update (json age): ", dt_last_update)
-        modified_since = time.strftime(
-            "%a, %d %b %Y %H:%M:%S GMT", time.gmtime(file_name.stat().st_mtime)
-        )[0:]
-        print("download if after:", modified_since)
+        datas = json.loads(meta_file.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+    return {k: v for k, v in datas.items() if k in ("ETag", "Last-Modified") and v}
+
+
+def save_validators(meta_file: Path, headers) -> None:
+    datas = {k: headers[k] for k in ("ETag", "Last-Modified") if headers.get(k)}
+    meta_file.write_text(json.dumps(datas))
+
 
+def download(
+    file_name: Path,
+    url: str,
+    time_file: Path,
+    meta_file: Path,
+    progress: Callable[[int, int, float], None] | None = None,
+) -> int:
+    """download aur database in /tmp/
+    only one conditional GET, validators are saved in `meta_file`
+    stream network -> gzip -> temp file, then rename over `file_name`
+    `progress(bytes_read, bytes_total, bytes_per_second)` is called for each chunk
+    """
     print(f"\n:: Download Database... in {file_name}")
-    req = request.Request(url, method="HEAD")
+    req = request.Request(url)
     req.add_header("User-Agent", f"'User-Agent': '{_get_user_agent()}'")
     req.add_header(
         "Accept-Encoding", "gzip"
     )  # ? https://gitlab.archlinux.org/archlinux/aurweb/-/issues/175
 
     if file_name.exists():
-        req.add_header("If-Modified-Since", modified_since)
+        validators = load_validators(meta_file)
+        print("download if modified:", validators)
+        if etag := validators.get("ETag"):
+            req.add_header("If-None-Match", etag)
+        if modified := validators.get("Last-Modified"):
+            req.add_header("If-Modified-Since", modified)
 
-        with request.urlopen(req) as response:
-            expire = convert_header_date(response.headers["Expires"])
-            ismodified = convert_header_date(response.headers["Last-Modified"])
-            print("expire:", expire)
-            utc_time = datetime.datetime.utcnow()
-            print("cache expire in:", expire - utc_time)
-            if file_name.exists():
-                if dt_last_update > ismodified or expire < dt_last_update:
-                    print("http 304: use cache")
-                    return 304
-
-    req.method = "GET"
+    tmp_file = file_name.with_name(f"{file_name.name}.part")
     try:
         with request.urlopen(req) as response:
-            if response.status == 200:
-                file_name.unlink(missing_ok=True)
             if response.status == 304:
                 return 304
-            with gzip.GzipFile(fileobj=response) as uncompressed, open(
-                file_name, "wb"
+            total = int(response.headers.get("Content-Length") or 0)
+            reader = _ProgressReader(response, total, progress)
+            with gzip.GzipFile(fileobj=reader) as uncompressed, open(
+                tmp_file, "wb"
             ) as out_file:
-                out_file.write(uncompressed.read())
-    except error.HTTPError as err:  # can also have gz error
+                while chunk := uncompressed.read(CHUNK_SIZE):
+                    out_file.write(chunk)
+                    reader.notify()
+        # never replace a good cache by a half-written file
+        os.replace(tmp_file, file_name)
+        save_validators(meta_file, response.headers)
+    except error.HTTPError as err:
+        tmp_file.unlink(missing_ok=True)
+        if err.code == 304:
+            print("http 304: use cache")
+            return 304
+        print(err)
+        print(f"\nBad connexion ?: {url}")
+        return 404
+    except (error.URLError, OSError, EOFError, zlib.error) as err:  # or gz error
+        tmp_file.unlink(missing_ok=True)
         print(err)
         print(f"\nBad connexion ?: {url}")
         return 404
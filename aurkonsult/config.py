@@ -2,7 +2,7 @@ import os
 import sys
 import time
 from pathlib import Path
-from typing import Generator
+from .localdb import LocalDB
 
 PkgDesc = tuple[str, str, str, str, str]  # values in local desc package file
 
@@ -21,12 +21,15 @@ class Configuration:
             "history": False,
             "pamac": False,
             "homecache": False,
+            "lazy": False,
+            "jobs": 0,
         }
         self.load_user_conf()
         self.load_user_params()
         self.time_since_update = int(time.time() - (3600 * 48))
         start_time = time.time()
-        # NOTE : never reload (bad if pkg installed since; bof: version is the last)
+        self.local_db = LocalDB(cache=self.local_cache)
+        # NOTE : reloaded by gui when pacman local database changes (Window.onLocalChanged)
         self.user_aurs = self.load_aur_user()
         print(
             "get aur pkgs installed, duration: "
@@ -58,16 +61,32 @@ class Configuration:
     def db_save(self) -> Path:
         return Path.home() / f".cache/{self.db_name}.json"
 
+    @property
+    def db_snapshot(self) -> Path:
+        """parsed packages, binary cache of `db_file`
+        always in ~/.cache: a file in /tmp can be written by other users"""
+        return Path.home() / f".cache/{self.db_name}.snapshot"
+
     @property
     def db_time(self) -> Path:
         return Path.home() / f".cache/{self.db_name}.time"
 
+    @property
+    def db_meta(self) -> Path:
+        """http validators of last download"""
+        return self.db_time.with_suffix(".meta")
+
+    @property
+    def local_cache(self) -> Path:
+        """parsed desc files of pacman local database"""
+        return Path.home() / f".cache/{self.PKGNAME}-local.pickle"
+
     def load_user_conf(self):
         """load user configuration"""
         conf = UserConf(self.USER_CONF_FILE)
         datas = conf.read()
         for key in self.attributes:
-            self.attributes[key] = datas.get(key, False)
+            self.attributes[key] = datas.get(key, self.attributes[key])
 
     def load_user_params(self):
         """override .conf file"""
@@ -81,6 +100,19 @@ class Configuration:
             self.attributes["history"] = True
         if "--homecache" in sys.argv:
             self.attributes["homecache"] = True
+        if "--lazy" in sys.argv:
+            self.attributes["lazy"] = True
+        for arg in sys.argv:
+            if arg.startswith("--jobs="):
+                self.attributes["jobs"] = arg.split("=", 1)[1]
+
+    @property
+    def jobs(self) -> int:
+        """processes for parse json, 0: cpu count, 1: not parallel"""
+        try:
+            return max(int(self.attributes["jobs"]), 0)  # "1" is read as True
+        except ValueError:
+            return 0
 
     def get_update_since(self) -> int:
         def setlong(stime):
@@ -108,41 +140,12 @@ class Configuration:
         print("New package since:", ret, "in 'highlight' color\n")
         return int(old_update)
 
-    @staticmethod
-    def load_aur_user() -> dict[str, PkgDesc]:
-        ret = {}
-        for pkg in Configuration._get_aur_pkgs():
-            ret[pkg[0]] = pkg
-        return ret
-
-    @staticmethod
-    def _get_aur_pkgs() -> Generator[PkgDesc, None, None]:
-        """pkg installed with no packager
-        not have all pkg not in repot !
-        diff : old packages in repot (as yaourt,...)
-        ----
-        best speed here vs use pacman pacman -Qm :
-            get_aur_pkgs(): duration: -- 0.10 seconds --
-            pacman -Qm:     duration: -- 0.48 seconds --
+    def load_aur_user(self) -> dict[str, PkgDesc]:
+        """pkg installed and not in a repo, desc files read only if changed:
+        cold cache: desc files are read by threads
         """
-        pkg = ()
-        for desc_file in Path("/var/lib/pacman/local/").glob("*/desc"):
-            with desc_file.open("r") as file:
-                for line in file:
-                    match line:
-                        case "%NAME%\n":
-                            pkg = (str(next(file)).rstrip(),)
-                        case "%VERSION%\n":
-                            pkg += (str(next(file)).rstrip(),)
-                        case "%DESC%\n":
-                            pkg += (str(next(file)).rstrip(),)
-                        case "%URL%\n":
-                            pkg += (str(next(file)).rstrip(),)
-                        case "%VALIDATION%\n":
-                            line = str(next(file)).rstrip()
-                            if line == "none":
-                                yield PkgDesc(pkg)
-                                break
+        self.local_db.refresh()
+        return self.local_db.aur_packages()
 
 
 class UserConf:
@@ -3,9 +3,10 @@ Packages class
 """
 import json
 import time
-from typing import Any, Generator
+from typing import Any, Callable, Generator, Iterable
 from urllib import parse
 from ctypes import cdll, CDLL
+from .store import PackageStore
 
 
 FIELDS = (
@@ -32,60 +33,119 @@ FIELDS = (
     "version_local",
     "vercmp",
 )
+LOCAL_FIELDS = ("version_local", "vercmp")  # not in aur database
+DETACHED = PackageStore()  # rows of packages created alone, not in a database
 
 
 class Package:
-    """json representation"""
+    """json representation, view of one row in a PackageStore"""
 
-    __slots__ = FIELDS
+    __slots__ = ("_store", "_row")
     # _arrays = ('License', 'Keywords', 'Depends', 'MakeDepends', 'OptDepends', 'Conflicts', 'Provides')
 
-    def __init__(self, jsondict: dict = None) -> None:
-        self.id = ""
-        self.name = ""
-        self.package_base = ""
-        self.version = ""
-        self.description = ""
-        self.url = ""
-        # self.url_path = ""
-        self.maintainer = ""
-        self.out_of_date = None
-        self.first_submitted: int = 0
-        self.last_modified: int = 0
-        self.popularity: float = 0.0
-        self.num_votes: int = 0
-        # extend :
-        self.license: list[str] = []
-        self.keywords: list[str] = []
-        self.depends: list[str] = []
-        self.make_depends: list[str] = []
-        self.opt_depends: list[str] = []
-        self.conflicts: list[str] = []
-        self.provides: list[str] = []
-        self.vercmp: int = 0
-
-        self.version_local: str = ""
+    def __init__(
+        self, jsondict: dict = None, store: PackageStore = None, row: int = -1
+    ) -> None:
+        if store is None:
+            # package alone, not in database: one store for all
+            store = DETACHED
+            row = store.new_row()
+        self._store = store
+        self._row = row
         if jsondict:
             self.populate(jsondict)
 
+    @classmethod
+    def view(cls, store: PackageStore, row: int) -> "Package":
+        pkg = cls.__new__(cls)
+        pkg._store = store
+        pkg._row = row
+        return pkg
+
+    @classmethod
+    def from_store(cls, store: PackageStore) -> list["Package"]:
+        """all packages in store"""
+        return [cls.view(store, row) for row in range(len(store))]
+
+    @classmethod
+    def from_aur_dict(cls, data: dict, store: PackageStore = None) -> "Package":
+        """create package from a json record, append it in `store`"""
+        return cls.from_records((data,), store)[0]
+
+    @classmethod
+    def from_records(
+        cls, records: Iterable[dict], store: PackageStore = None
+    ) -> list["Package"]:
+        """bulk create packages from json records, faster than populate()"""
+        if store is None:
+            store = PackageStore()
+        append = cls.record_appender(store)
+        view = cls.view
+        packages = []
+        for data in records:
+            pkg = view(store, append(data))
+            if version := data.get("VersionLocal"):
+                pkg.set_version_local(version)
+            packages.append(pkg)
+        return packages
+
+    @staticmethod
+    def record_appender(store: PackageStore) -> Callable[[dict], int]:
+        """function: add a json record in columns of store, return its row
+        no Package is created, local version is not set"""
+        append = store.appender(AUR_RECORD_NAMES)
+
+        def append_record(data: dict) -> int:
+            if data.get("PackageBase") == data.get("Name"):
+                data["PackageBase"] = ""
+            return append(data)
+
+        return append_record
+
     def populate(self, data: dict):
         """inject datas from json field"""
-        for attr in FIELDS:
-            attr_aur = self.denormalize_name_attr(attr)
-            try:
-                if value := data[attr_aur]:
-                    # not inject other type as NoneType (bad for sort)
-                    setattr(self, attr, value)
-            except:
-                pass  # this model not use
-                # raise
+        for attr, attr_aur in AUR_NAMES.items():
+            if value := data.get(attr_aur):
+                # not inject other type as NoneType (bad for sort)
+                setattr(self, attr, value)
         self.set_version_local(self.version_local)
         if self.package_base == self.name:
             self.package_base = ""
 
+    def aur_values(self) -> tuple:
+        """values from aur database, for compare two versions of database"""
+        return tuple(getattr(self, k) for k in FIELDS if k not in LOCAL_FIELDS)
+
+    def update(self, other: "Package"):
+        """use values of a new version of this package (same row in store)"""
+        self._store = other._store
+        self._row = other._row
+
     def is_installed(self) -> bool:
         return bool(self.version_local)
 
+    # flags of status()
+    INSTALLED, OUT_OF_DATE, NEW, LOCAL_NEWER, AUR_NEWER, NOT_IN_AUR = (
+        1 << i for i in range(6)
+    )
+
+    def status(self, since: int = 0) -> int:
+        """all flags for display package, NEW if submitted after `since`"""
+        flags = 0
+        if self.version_local:
+            flags |= self.INSTALLED
+        if self.out_of_date:
+            flags |= self.OUT_OF_DATE
+        if since and self.first_submitted > since:
+            flags |= self.NEW
+        if not self.version:
+            flags |= self.NOT_IN_AUR
+        if (vercmp := self.vercmp) > 0:
+            flags |= self.LOCAL_NEWER
+        elif vercmp < 0:
+            flags |= self.AUR_NEWER
+        return flags
+
     def set_version_local(self, version):
         self.version_local = version
         self.vercmp = 0
@@ -119,7 +179,7 @@ class Package:
 
     def fields(self) -> Generator[tuple[str, Any], None, None]:
         """iterate from attributes, return tuple key, value"""
-        for k in self.__slots__:
+        for k in FIELDS:
             yield k, getattr(self, k, "")
 
     def __repr__(self) -> str:
@@ -185,6 +245,8 @@ class Package:
         """aur field name to python class name attribute"""
         if name == "URL":
             return "url"
+        if name == "ID":
+            return "id"
         ret = ""
         for i, char_name in enumerate(name):
             if ord(char_name) in range(ord("A"), ord("Z") + 1):
@@ -199,6 +261,8 @@ class Package:
         """python class name attribute to aur field name"""
         if name == "url":
             return "URL"
+        if name == "id":
+            return "ID"
         ret = ""
         names = list(name)
         names[0] = names[0].upper()
@@ -237,6 +301,13 @@ class Package:
     """
 
 
+for _attr in FIELDS:
+    setattr(Package, _attr, PackageStore.column_property(_attr))
+
+AUR_NAMES = {attr: Package.denormalize_name_attr(attr) for attr in FIELDS}
+AUR_RECORD_NAMES = {k: v for k, v in AUR_NAMES.items() if k not in LOCAL_FIELDS}
+
+
 """
 # TODO graph dependencies
 def getAllDependencies(package_list) ->dict:
@@ -268,10 +339,13 @@ def getAllDependencies(package_list) ->dict:
 """
 
 #cdll.LoadLibrary("libalpm.so")
-libalpm = CDLL("libalpm.so")
+libalpm = None  # loaded by first vercmp(), not in parser processes
 
 
 def vercmp(ver1: str, ver2: str) -> int:
     """==0 : same, <0: if ver1<ver2 , >0: if ver1>ver2"""
+    global libalpm
+    if libalpm is None:
+        libalpm = CDLL("libalpm.so")
     cchar1, cchar2 = bytes(ver1.encode()), bytes(ver2.encode())
     return libalpm.alpm_pkg_vercmp(cchar1, cchar2)
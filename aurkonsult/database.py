@@ -0,0 +1,505 @@
+"""
+read aur json database
+"""
+import gc
+import json
+import marshal
+import mmap
+import multiprocessing
+import os
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from pathlib import Path
+from typing import Generator, Iterable, NamedTuple
+from .config import PkgDesc
+from .core import Package, FIELDS, LOCAL_FIELDS, AUR_NAMES
+from .store import PackageStore, LISTS, POOLED, TEXTS
+
+SNAPSHOT_VERSION = 4  # change if format or Package fields change
+PARALLEL_MIN_SIZE = 8 * 1024 * 1024  # smaller json file is parsed in one process
+BATCH_SIZE = 2000  # packages sent to gui by block
+LAZY_FIELDS = (  # loaded by lazy mode, for list view
+    "id",
+    "name",
+    "version",
+    "url",
+    "first_submitted",
+    "last_modified",
+    "out_of_date",
+    "maintainer",
+)
+
+
+def read_json(
+    file_name: Path,
+    user_aurs: dict[str, PkgDesc],
+    limit: int = -1,
+    store: PackageStore | None = None,
+) -> Generator[Package, None, None]:
+    """read aur database, one package by line, values are saved in `store`"""
+    if store is None:
+        store = PackageStore()
+    with open(file_name, mode="r") as json_file:
+        yield from _read_lines(json_file, user_aurs, limit, store)
+
+
+def _read_lines(
+    lines: Iterable[str],
+    user_aurs: dict[str, PkgDesc],
+    limit: int,
+    store: PackageStore,
+) -> Generator[Package, None, None]:
+    i = -1
+    records = []
+    for line in lines:
+        """load line by line and convert to package : time is x2 !"""
+        if i + 1 == limit:  # `limit` packages, as read_index()
+            break
+        if data := _parse_line(line):
+            i += 1
+            if data["Name"] in user_aurs:
+                data["VersionLocal"] = user_aurs[data["Name"]][1]
+            records.append(data)
+            if len(records) >= BATCH_SIZE:
+                yield from Package.from_records(records, store)
+                records = []
+    yield from Package.from_records(records, store)
+
+
+def _parse_line(line: str) -> dict | None:
+    """json record of one line, None if not a package"""
+    if len(line) <= 10:
+        return None
+    line = line.rstrip("\n")
+    if line.endswith(","):
+        line = line[:-1]
+    try:
+        return json.loads(line)
+    except Exception:
+        print(f"Error: read json! {line}")
+        raise
+
+
+def _split_ranges(file_name: Path, count: int) -> list[tuple[int, int]]:
+    """byte ranges of file, each range begins at start of a line"""
+    size = file_name.stat().st_size
+    bounds = [0]
+    with open(file_name, "rb") as fin:
+        for i in range(1, count):
+            fin.seek(max(size * i // count, bounds[-1]))
+            fin.readline()  # go to next record
+            bounds.append(min(fin.tell(), size))
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _parse_range(file_name: Path, start: int, end: int) -> PackageStore:
+    """in other process: parse a part of file, return a store (compact to send)
+    records are written in columns, no Package is created"""
+    store = PackageStore()
+    append = Package.record_appender(store)
+    with open(file_name, "rb") as fin:
+        fin.seek(start)
+        lines = fin.read(end - start).decode().splitlines(keepends=True)
+    gc.disable()
+    try:
+        for line in lines:
+            if data := _parse_line(line):
+                append(data)
+    finally:
+        gc.enable()
+    return store
+
+
+def _merge(
+    store: PackageStore, part: PackageStore, user_aurs: dict[str, PkgDesc]
+) -> list[Package]:
+    """add a parsed part in store, return its packages"""
+    first = len(store)
+    store.extend(part)
+    packages = [Package.view(store, row) for row in range(first, len(store))]
+    for pkg in packages:
+        if local := user_aurs.get(pkg.name):
+            pkg.set_version_local(local[1])
+    return packages
+
+
+def read_json_parallel(
+    file_name: Path, user_aurs: dict[str, PkgDesc], store: PackageStore, jobs: int = 0
+) -> Generator[list[Package], None, None]:
+    """parse json file in processes, yield packages by part in file order
+    continue in this process if pool is not possible"""
+    jobs = jobs or os.cpu_count() or 1
+    if jobs < 2 or file_name.stat().st_size < PARALLEL_MIN_SIZE:
+        yield from _batches(read_json(file_name, user_aurs, store=store))
+        return
+    start_time = time.time()
+    ranges = _split_ranges(file_name, jobs * 2)
+    context = multiprocessing.get_context("spawn")  # not fork a Qt application
+    done = 0
+    try:
+        with ProcessPoolExecutor(jobs, mp_context=context) as executor:
+            for part in executor.map(partial(_parse_range, file_name), *zip(*ranges)):
+                done += 1
+                yield _merge(store, part, user_aurs)
+    except (OSError, BrokenProcessPool) as err:
+        print(f"Error: parallel json load ({err}), continue in one process")
+        for start, end in ranges[done:]:
+            yield _merge(store, _parse_range(file_name, start, end), user_aurs)
+    print(
+        f"json to data ({jobs} jobs) duration: "
+        f"-- {(time.time() - start_time)} seconds --"
+    )
+
+
+def _batches(
+    packages: Iterable[Package], size: int = BATCH_SIZE
+) -> Generator[list[Package], None, None]:
+    batch = []
+    for pkg in packages:
+        batch.append(pkg)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _db_key(file_name: Path) -> tuple[int, int]:
+    stat = file_name.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def read_snapshot(
+    file_name: Path, snapshot: Path, user_aurs: dict[str, PkgDesc]
+) -> list[Package] | None:
+    """packages from binary snapshot, None if not exists, outdated or corrupt
+    file must be owned by user; marshal of plain types, loading never runs code"""
+    gc.disable()  # no gc pass while creating thousands of objects
+    try:
+        with snapshot.open("rb") as fin:
+            stat = os.fstat(fin.fileno())
+            if stat.st_uid != os.getuid() or stat.st_mode & 0o022:
+                print(f"Error: snapshot {snapshot} not owned by user or writable")
+                return None
+            datas = marshal.loads(fin.read())  # load(fin) is 10x slower
+        if (
+            type(datas) is not dict
+            or datas.get("version") != SNAPSHOT_VERSION
+            or datas.get("fields") != list(FIELDS)
+            or datas.get("key") != list(_db_key(file_name))
+        ):
+            print("snapshot is outdated")
+            return None
+        store = PackageStore.from_columns(datas["store"])
+        store.reset_local()
+        packages = Package.from_store(store)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError, TypeError, KeyError) as err:
+        print(f"Error: bad snapshot {snapshot}: {err!r}")
+        return None
+    finally:
+        gc.enable()
+    for pkg in packages:
+        if local := user_aurs.get(pkg.name):
+            pkg.set_version_local(local[1])
+    return packages
+
+
+def write_snapshot(file_name: Path, snapshot: Path, store: PackageStore):
+    """save packages store, key is database file mtime and size"""
+    datas = {
+        "version": SNAPSHOT_VERSION,
+        "fields": list(FIELDS),
+        "key": list(_db_key(file_name)),
+        "store": store.columns(),
+    }
+    tmp_file = snapshot.with_name(f"{snapshot.name}.part")
+    try:
+        snapshot.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        with open(
+            os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb"
+        ) as fout:
+            marshal.dump(datas, fout)
+        os.replace(tmp_file, snapshot)
+    except (OSError, ValueError) as err:
+        tmp_file.unlink(missing_ok=True)
+        print(f"Error: snapshot not saved {snapshot}: {err}")
+
+
+class LazyColumn:
+    """column not loaded, value is read in json record of package
+    values set after load are kept in `values`"""
+
+    __slots__ = ("store", "key", "default", "pooled", "values")
+
+    def __init__(self, store, attr: str, default) -> None:
+        self.store = store
+        self.key = AUR_NAMES[attr]
+        self.default = default
+        self.pooled = attr in POOLED
+        self.values = {}  # row: value
+
+    def __getitem__(self, row: int):
+        try:
+            return self.values[row]
+        except KeyError:
+            pass
+        value = self.store.record(row).get(self.key) or self.default
+        return self.store.strings.add(value) if self.pooled else value
+
+    def __setitem__(self, row: int, value):
+        self.values[row] = value
+
+
+class LazyPackageStore(PackageStore):
+    """only columns for list view are loaded, others are read in mmapped json file"""
+
+    CACHE_SIZE = 512  # records decoded
+
+    def __init__(self, file_name: Path) -> None:
+        super().__init__()
+        with open(file_name, "rb") as fin:
+            self.source = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+        self.starts = array("q")
+        self.ends = array("q")
+        self._records = OrderedDict()
+        for attr in FIELDS:
+            if attr in LISTS:
+                setattr(self, attr, LazyColumn(self, attr, ()))
+            elif attr not in LAZY_FIELDS and attr not in LOCAL_FIELDS:
+                default = "" if attr in TEXTS or attr in POOLED else 0
+                setattr(self, attr, LazyColumn(self, attr, default))
+
+    def load(self, limit: int = -1):
+        """index records, only decode values for list view"""
+        source = self.source
+        add = self.strings.add
+        columns = [
+            (
+                getattr(self, attr),
+                self.key(attr),
+                attr in POOLED,
+                "" if attr in TEXTS or attr in POOLED else 0,
+            )
+            for attr in LAZY_FIELDS
+        ]
+        decode = json.JSONDecoder().decode
+        end = 0
+        while self.size != limit and (line := source.readline()):
+            start, end = end, source.tell()
+            if len(line) <= 10:
+                continue
+            data = decode(line.decode().rstrip(",\n"))
+            for column, key, pooled, default in columns:
+                value = data.get(key) or default
+                column.append(add(value) if pooled else value)
+            self.starts.append(start)
+            self.ends.append(end)
+            self.version_local.append(0)
+            self.vercmp.append(0)
+            self.size += 1
+
+    @staticmethod
+    def key(attr: str) -> str:
+        return AUR_NAMES[attr]
+
+    def record(self, row: int) -> dict:
+        """all values of package, decoded from json file"""
+        try:
+            self._records.move_to_end(row)
+            return self._records[row]
+        except KeyError:
+            pass
+        data = json.loads(self.source[self.starts[row] : self.ends[row]].rstrip(b",\n"))
+        if data.get("PackageBase") == data.get("Name"):
+            data["PackageBase"] = ""
+        self._records[row] = data
+        if len(self._records) > self.CACHE_SIZE:
+            self._records.popitem(last=False)
+        return data
+
+    def _set_list(self, row: int, attr: str, values: list[str]):
+        getattr(self, attr)[row] = list(values or ())
+
+    def get_list(self, row: int, attr: str) -> list[str]:
+        return list(getattr(self, attr)[row])
+
+
+def read_index(
+    file_name: Path, user_aurs: dict[str, PkgDesc], limit: int = -1
+) -> list[Package]:
+    """lazy mode: index json file, package details are decoded only if used"""
+    start_time = time.time()
+    store = LazyPackageStore(file_name)
+    gc.disable()
+    try:
+        store.load(limit)
+    finally:
+        gc.enable()
+    packages = Package.from_store(store)
+    for pkg in packages:
+        if local := user_aurs.get(pkg.name):
+            pkg.set_version_local(local[1])
+    print(f"json index duration: -- {(time.time() - start_time)} seconds --")
+    return packages
+
+
+def iter_packages(
+    file_name: Path,
+    snapshot: Path,
+    user_aurs: dict[str, PkgDesc],
+    limit: int = -1,
+    lazy: bool = False,
+    jobs: int = 0,
+) -> Generator[list[Package], None, None]:
+    """load database by blocks of packages, first packages are quickly available
+    from snapshot if up to date, else from json and save snapshot
+    jobs: processes for parse json, 0: cpu count, 1: not parallel
+    """
+    if lazy:
+        yield from _batches(read_index(file_name, user_aurs, limit))
+        return
+    if limit > -1:
+        yield from _batches(read_json(file_name, user_aurs, limit))
+        return
+    start_time = time.time()
+    if (packages := read_snapshot(file_name, snapshot, user_aurs)) is not None:
+        print(f"snapshot to data duration: -- {(time.time() - start_time)} seconds --")
+        yield from _batches(packages)
+        return
+    store = PackageStore()
+    yield from read_json_parallel(file_name, user_aurs, store, jobs)
+    write_snapshot(file_name, snapshot, store)
+
+
+def load_packages(
+    file_name: Path,
+    snapshot: Path,
+    user_aurs: dict[str, PkgDesc],
+    limit: int = -1,
+    lazy: bool = False,
+    jobs: int = 0,
+) -> list[Package]:
+    """load all database"""
+    return [
+        pkg
+        for packages in iter_packages(
+            file_name, snapshot, user_aurs, limit, lazy, jobs
+        )
+        for pkg in packages
+    ]
+
+
+class ChangeSet(NamedTuple):
+    """differences between 2 versions of database, keys are aur ID"""
+
+    added: list[Package]
+    removed: set[int]
+    changed: dict[int, Package]
+    packages: dict[int, Package]  # all new packages
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def __str__(self) -> str:
+        return (
+            f"added: {len(self.added)}, removed: {len(self.removed)}, "
+            f"changed: {len(self.changed)}"
+        )
+
+
+def diff_packages(olds: Iterable[Package], news: Iterable[Package]) -> ChangeSet:
+    """compare previous packages with new database, by aur ID
+    values are compared by columns of stores, not by Package"""
+    start_time = time.time()
+    previous = {pkg.id: pkg for pkg in olds if pkg.id}
+    added = []
+    packages = {}
+    pairs: dict[tuple[PackageStore, PackageStore], tuple[list, list]] = {}
+    for pkg in news:
+        packages[pkg.id] = pkg
+        try:
+            old = previous.pop(pkg.id)
+        except KeyError:
+            added.append(pkg)
+            continue
+        try:
+            pair = pairs[old._store, pkg._store]
+        except KeyError:
+            pair = pairs[old._store, pkg._store] = ([], [])
+        pair[0].append(old)
+        pair[1].append(pkg)
+    changed = {}
+    for (old_store, new_store), (old_packages, new_packages) in pairs.items():
+        if type(old_store) is PackageStore and type(new_store) is PackageStore:
+            indexes = old_store.changed_rows(
+                [pkg._row for pkg in old_packages],
+                new_store,
+                [pkg._row for pkg in new_packages],
+                LOCAL_FIELDS,
+            )
+        else:  # lazy store: values are not all in columns
+            indexes = [
+                i
+                for i, (old, pkg) in enumerate(zip(old_packages, new_packages))
+                if old.aur_values() != pkg.aur_values()
+            ]
+        for i in indexes:
+            changed[new_packages[i].id] = new_packages[i]
+    changes = ChangeSet(added, set(previous), changed, packages)
+    print(f"diff database: {changes} -- {(time.time() - start_time)} seconds --")
+    return changes
+
+
+class LocalJoin(NamedTuple):
+    """installed packages joined to aur packages by name"""
+
+    installed: list[Package]  # in aur, local version is set
+    missing: list[Package]  # not in aur, new packages with only local values
+    outdated: list[Package]  # new version in aur
+    newer: list[Package]  # local version is forward
+
+    def __str__(self) -> str:
+        return (
+            f"installed: {len(self.installed)}, missing: {len(self.missing)}, "
+            f"outdated: {len(self.outdated)}, newer: {len(self.newer)}"
+        )
+
+
+def join_local(names: dict[str, Package], user_aurs: dict[str, PkgDesc]) -> LocalJoin:
+    """one pass on local packages, `names` is index name: aur package
+    vercmp only if local version changed"""
+    start_time = time.time()
+    installed, outdated, newer = [], [], []
+    records = []
+    for name, desc in user_aurs.items():
+        pkg = names.get(name)
+        if pkg is None:
+            # pkg is not in aur, add new to list
+            records.append(
+                {
+                    "Name": desc[0],
+                    "VersionLocal": desc[1],
+                    "Description": desc[2],
+                    "URL": desc[3],
+                }
+            )
+            continue
+        if pkg.version_local != desc[1]:
+            pkg.set_version_local(desc[1])
+        installed.append(pkg)
+        if pkg.vercmp < 0:
+            outdated.append(pkg)
+        elif pkg.vercmp > 0:
+            newer.append(pkg)
+    # in a store of this join, not in DETACHED: freed with the previous join
+    missing = Package.from_records(records)
+    joined = LocalJoin(installed, missing, outdated, newer)
+    print(f"join local: {joined} -- {(time.time() - start_time)} seconds --")
+    return joined
@@ -4,7 +4,6 @@ import sys
 import os
 import time
 from urllib import request
-import json
 import subprocess
 from pathlib import Path
 import shutil
@@ -24,6 +23,7 @@ from aurkonsult import UserConf, Configuration
 from aurkonsult import vercmp
 from aurkonsult import Package
 from aurkonsult import api
+from aurkonsult import database
 from aurkonsult.gui import models
 from aurkonsult.gui import widgets, ICONS
 
@@ -32,6 +32,8 @@ class WinMain(QtWidgets.QMainWindow):
     def __init__(self, config: Configuration):
         super(WinMain, self).__init__()
         self.threadpool = QtCore.QThreadPool()
+        # load, update and search can run together, even with few cpus
+        self.threadpool.setMaxThreadCount(max(4, self.threadpool.maxThreadCount()))
 
         exitAction = QtWidgets.QAction(
             ICONS.load(ICONS.close), _("Exit") + " (Ctrl+X)", self
@@ -112,20 +114,44 @@ class WinMain(QtWidgets.QMainWindow):
             QtCore.QTimer.singleShot(400, self.onUpdate)
 
     def onUpdate(self):
-        worker = widgets.Worker(self.isUpdated, self.win.config)
+        worker = widgets.Worker(
+            self.isUpdated, self.win.config, self.onDownloadProgress
+        )
         self.threadpool.start(worker)
         self.win.tabs.setCurrentIndex(0)
 
+    @QtCore.pyqtSlot(int, int, float)
+    def onDownloadProgress(self, done: int, total: int, speed: float):
+        msg = f"{_('Download')}: {done // 1024} Kb"
+        if total:
+            msg += f" / {total // 1024} Kb ({done * 100 // total}%)"
+        self.statusBar().showMessage(f"{msg} - {speed / 1024:.0f} Kb/s")
+
     @QtCore.pyqtSlot(int)
     def isUpdated(self, return_code: int):
         print("database is updated", return_code)
+        self.statusBar().clearMessage()
         txt = "?"
         if return_code == 304:
             txt = _("No new database available")
         elif return_code == 200:
             txt = _("OK new version")
         # update treeview
-        QtCore.QTimer.singleShot(200, self.win.loadPackages)
+        if (
+            return_code == 200
+            and self.win.proxyModel._origin
+            and not self.win.loading
+            and not self.win.config.attributes["lazy"]
+        ):
+            worker = widgets.DiffWorker(
+                self.win.applyChanges,
+                self.win.config,
+                self.win.proxyModel._origin,
+                self.win.loadLimit(),
+            )
+            self.threadpool.start(worker)
+        elif return_code == 200 or not self.win.proxyModel._origin:
+            QtCore.QTimer.singleShot(200, self.win.loadPackages)
         QtWidgets.QMessageBox.information(
             None,
             _("Database update"),
@@ -189,6 +215,7 @@ class WinMain(QtWidgets.QMainWindow):
         )
         self.win.loadPackages(False)
         self.win.filterPatternLineEdit.setText("")
+        self.win.cancelSearch()
         self.win.currentModel.filterNews(self.win.config.time_since_update)
         self.setWindowTitle(
             f"{_('AUR list')} - {len(self.win.currentModel._origin)} - {self.win.currentModel.rowCount()}"
@@ -221,11 +248,35 @@ class WinMain(QtWidgets.QMainWindow):
 
 
 class Window(QtWidgets.QWidget):
+    SEARCH_DELAY = 250  # ms without key pressed before search
+    LOCAL_DELAY = 1000  # ms after last change in pacman local database
+
     def __init__(self, parent, config: Configuration):
         super(Window, self).__init__()
         self.parent = parent
         self.config = config
         self.index = QtCore.QModelIndex()
+        self.loading = False
+        self.reload = False
+        self.load_time = 0.0
+        self.search_id = 0
+        self.search_worker: widgets.SearchWorker | None = None
+        self.search_timer = QtCore.QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.textFilterChanged)
+        # pacman writes many directories by transaction, apply once at end
+        self.local_timer = QtCore.QTimer(self)
+        self.local_timer.setSingleShot(True)
+        self.local_timer.setInterval(self.LOCAL_DELAY)
+        self.local_timer.timeout.connect(self.onLocalChanged)
+        # install, upgrade and remove add or delete a `name-version` directory.
+        # `pacman -D` rewrites a desc in place: no signal, but only the install
+        # reason changes and it is not displayed; next refresh reads this desc
+        self.local_watcher = QtCore.QFileSystemWatcher(
+            [str(self.config.local_db.path)], self
+        )
+        self.local_watcher.directoryChanged.connect(lambda _: self.local_timer.start())
 
         layout = QtWidgets.QGridLayout()
 
@@ -242,6 +293,7 @@ class Window(QtWidgets.QWidget):
 
         self.proxyModel = models.packageModel(self)
         self.checkModel = models.checkModel(self)
+        self.proxyModel.time_since_update = self.config.time_since_update
         self.currentModel = self.proxyModel
 
         self.sourceView = widgets.packageTree()
@@ -259,20 +311,31 @@ class Window(QtWidgets.QWidget):
 
         self.filterPatternLineEdit = QtWidgets.QLineEdit()
         self.filterPatternLineEdit.setText("")
-        self.completer_model = QtCore.QStringListModel()
+        self.completer_model = models.completerModel(self)
         self.completer = QtWidgets.QCompleter(self.completer_model, self)
-        self.completer.setCaseSensitivity(False)
-        self.completer.setModelSorting(True)
-        # self.completer.setFilterMode(QtCore.Qt.MatchFlag.MatchContains)    # start by is best
+        # model has only names for current prefix, completer not filter
+        self.completer.setCompletionMode(
+            QtWidgets.QCompleter.UnfilteredPopupCompletion
+        )
         self.filterPatternLineEdit.setCompleter(self.completer)
+        # before completer popup: QLineEdit emit textEdited and then complete
+        self.filterPatternLineEdit.textEdited.connect(self.onCompleteName)
         filterPatternLabel = QtWidgets.QLabel(_("Search") + ":")
         filterPatternLabel.setBuddy(self.filterPatternLineEdit)
         self.filterSyntaxComboBox = QtWidgets.QComboBox()
         self.filterSyntaxComboBox.addItem(_("Package name"), 0)
         self.filterSyntaxComboBox.addItem(_("Package name and Description"), 1)
+        self.filterSyntaxComboBox.addItem(_("Package name with typos"), 2)
+        self.filterSyntaxComboBox.addItem(_("Best matches"), 3)
+        self.filterSyntaxComboBox.addItem(_("Query"), 4)
+        self.filterSyntaxComboBox.setItemData(
+            4,
+            "maintainer:foo votes>100 outofdate:yes modified<30d license:MIT name~qt",
+            QtCore.Qt.ToolTipRole,
+        )
 
-        self.filterPatternLineEdit.textChanged.connect(self.textFilterChanged)
-        self.filterSyntaxComboBox.currentIndexChanged.connect(self.textFilterChanged)
+        self.filterPatternLineEdit.textChanged.connect(self.onFilterEdited)
+        self.filterSyntaxComboBox.currentIndexChanged.connect(self.onFilterEdited)
 
         findLayout = QtWidgets.QGridLayout()
         findLayout.addWidget(filterPatternLabel, 1, 0)
@@ -285,7 +348,7 @@ class Window(QtWidgets.QWidget):
             self.filterDepLineEdit.setPlaceholderText("+qt5-base -Gtk3")
             filterDepLabel = QtWidgets.QLabel(_("Dependencies") + ":")
             filterDepLabel.setBuddy(self.filterDepLineEdit)
-            self.filterDepLineEdit.textChanged.connect(self.textFilterChanged)
+            self.filterDepLineEdit.textChanged.connect(self.onFilterEdited)
 
             findLayout.addWidget(filterDepLabel, 2, 0)
             findLayout.addWidget(self.filterDepLineEdit, 2, 1)
@@ -536,13 +599,13 @@ class Window(QtWidgets.QWidget):
         self.form["FirstSubmitted"].setText(f"{pkg:FirstSubmitted}")
 
         self.form["MaintainerList"].clear()
-        self.form["MaintainerList"].addItems(
-            sorted(
-                p.name
-                for p in self.currentModel._origin
-                if p.maintainer == pkg.maintainer
+        if self.proxyModel.search_index:
+            packages = self.proxyModel.search_index.by_maintainer(pkg.maintainer)
+        else:
+            packages = (
+                p for p in self.currentModel._origin if p.maintainer == pkg.maintainer
             )
-        )
+        self.form["MaintainerList"].addItems(sorted(p.name for p in packages))
         self.form["Dependencies"].clear()
         self.form["Dependencies"].addItems(sorted(pkg.depends))
         self.form["OptDepends"].clear()
@@ -633,12 +696,29 @@ class Window(QtWidgets.QWidget):
         if action == aInstall:
             widgets.run_konsole(pkg.name, self.config.attributes["pamac"])
 
+    def changeEvent(self, event):
+        if event.type() == QtCore.QEvent.LocaleChange:
+            self.proxyModel.display.clear()
+            self.checkModel.display.clear()
+        super().changeEvent(event)
+
+    def onFilterEdited(self):
+        """search only when user stops typing"""
+        self.search_timer.start()
+
+    def cancelSearch(self):
+        self.search_timer.stop()
+        if self.search_worker:
+            self.search_worker.cancel()
+            self.search_worker = None
+
     def textFilterChanged(self):
         if not isinstance(self.currentModel, models.packageModel):
             return
 
         search = self.filterPatternLineEdit.text()
         if search and len(search) < 3:
+            self.cancelSearch()  # result of a longer text is not valid now
             return
         try:
             deps = self.filterDepLineEdit.text().split()
@@ -649,36 +729,57 @@ class Window(QtWidgets.QWidget):
         }
         deps_nones = {d[1:].lower() for d in deps if d[0:1] == "-"}
         print("Deps filter: want:", deps_wants, "not:", deps_nones)
-        QtWidgets.QApplication.instance().setOverrideCursor(
-            QtGui.QCursor(QtCore.Qt.WaitCursor)
-        )
+        self.cancelSearch()
+        self.search_id += 1
+        target = self.filterSyntaxComboBox.currentIndex()
+        model = self.currentModel
         try:
-            self.currentModel.filterPkg(
-                search, deps_wants, deps_nones, self.filterSyntaxComboBox.currentIndex()
-            )
-            if self.filterSyntaxComboBox.currentIndex() == 0:
-                self.completer_model.setStringList(
-                    (p.name for p in self.currentModel._data)
-                )
-            else:
-                self.completer_model.setStringList([""])
-            print("search end:", self.filterPatternLineEdit.text())
-        finally:
-            QtWidgets.QApplication.instance().restoreOverrideCursor()
+            match = model.matcher(search, deps_wants, deps_nones, target)
+        except ValueError as err:  # query not valid
+            self.parent.statusBar().showMessage(str(err), 5000)
+            return
+        query = model.query(search, deps_wants, deps_nones, target)
+        if not match:
+            model.setFilter(query, None, None)
+            self.onFilterApplied()
+            return
+        self.search_worker = widgets.SearchWorker(
+            self.onSearchFound, model, query, match, self.search_id
+        )
+        self.parent.threadpool.start(self.search_worker)
+
+    @QtCore.pyqtSlot(int, object)
+    def onSearchFound(self, search_id: int, result: list[Package]):
+        worker = self.search_worker
+        if not worker or worker.search_id != search_id:
+            return  # a new search is running
+        self.search_worker = None
+        if worker.generation != worker.model.generation:
+            # packages loaded or updated while searching
+            self.textFilterChanged()
+            return
+        worker.model.setFilter(worker.query, worker.match, result)
+        self.onFilterApplied()
+
+    def onCompleteName(self, text: str):
+        if self.filterSyntaxComboBox.currentIndex() != 0:
+            text = ""  # completion only for names
+        self.completer_model.setPrefix(text)
+
+    def onFilterApplied(self):
+        print("search end:", self.filterPatternLineEdit.text())
         self.parent.setWindowTitle(
             f"{_('AUR list')} - {len(self.currentModel._origin)} - {self.currentModel.rowCount()}"
         )
 
     def loadPackages(self, update=True):
-        QtWidgets.QApplication.instance().setOverrideCursor(
-            QtGui.QCursor(QtCore.Qt.WaitCursor)
-        )
         if update:
-            self.setSourceModel(self.config.db_file)
+            if self.loading:
+                self.reload = True  # database changed while loading
+            else:
+                self.setSourceModel(self.config.db_file)
         else:
-            self.proxyModel._data = self.proxyModel._origin
-        QtWidgets.QApplication.instance().restoreOverrideCursor()
-        self.proxyModel.layoutChanged.emit()
+            self.proxyModel.resetFilter()
         self.sourceView.setModel(self.proxyModel)
         self.currentModel = self.proxyModel
 
@@ -686,7 +787,13 @@ class Window(QtWidgets.QWidget):
         QtWidgets.QApplication.instance().setOverrideCursor(
             QtGui.QCursor(QtCore.Qt.WaitCursor)
         )
-        self.checkModel.inject(self.proxyModel._origin, self.config.user_aurs)
+        self.checkModel.inject(
+            self.proxyModel._origin, self.config.user_aurs, self.proxyModel.byName()
+        )
+        # local versions are set again in packages of list
+        self.proxyModel.updateStatus(
+            p for p in self.checkModel._data if p in self.proxyModel._status
+        )
         QtWidgets.QApplication.instance().restoreOverrideCursor()
         self.checkModel.layoutChanged.emit()
         self.sourceView.setModel(self.checkModel)
@@ -695,49 +802,114 @@ class Window(QtWidgets.QWidget):
             f"{_('AUR list')} - {len(self.currentModel._origin)} - {self.currentModel.rowCount()}"
         )
 
-    def setSourceModel(self, file_name):
-        def load_json():
-            max = -1
-            installeds = self.config.user_aurs.keys()
-            if "--mini" in sys.argv:
-                max = int(os.environ.get("MINI", 100))
-            with open(file_name, mode="r") as json_file:
-                i = -1
-                for line in json_file:
-                    """load line by line and convert to package : time is x2 !"""
-                    if len(line) > 10:
-                        i += 1
-                        line = line.rstrip("\n")
-                        if line.endswith(","):
-                            line = line[:-1]
-                        try:
-                            data = json.loads(line)
-                            try:
-                                if data["Name"] in installeds:
-                                    data["VersionLocal"] = self.config.user_aurs[
-                                        data["Name"]
-                                    ][1]
-                                yield data >> Package()
-                            except:
-                                print(f"Error: Package no imported ! {data}")
-                                raise
-                        except:
-                            print(f"Error: read json! {line}")
-                            raise
-                    if max > -1 and i > max:
-                        break
+    def applyChanges(self, changes: database.ChangeSet):
+        """database updated: apply only differences to packages loaded"""
+        start_time = time.time()
+        self.proxyModel.applyChanges(changes)
+        if changes.added or changes.removed:
+            self.completer_model.inject(p.name for p in self.proxyModel._origin)
+        print(f"apply changes duration: -- {(time.time() - start_time)} seconds --")
+        if self.currentModel is self.checkModel:
+            self.loadPackagesCheck()
+        else:
+            self.parent.setWindowTitle(
+                f"{_('AUR list')} - {len(self.currentModel._origin)} - {self.currentModel.rowCount()}"
+            )
+
+    def onLocalChanged(self):
+        """pacman local database changed: apply only packages installed, upgraded or removed"""
+        if self.loading:
+            self.local_timer.start()  # versions are set by loader
+            return
+        start_time = time.time()
+        local_db = self.config.local_db
+        changed, removed = local_db.refresh()
+        aurs = local_db.aur_packages()
+        versions = {}
+        for name in removed | changed.keys():
+            if pkg := aurs.get(name):
+                versions[name] = pkg.version
+            elif name in self.config.user_aurs:
+                versions[name] = ""  # removed or now installed from a repo
+        self.config.user_aurs = aurs
+        if not versions:
+            return
+        self.proxyModel.applyLocal(versions)
+        print(
+            f"local changes: {len(versions)} packages "
+            f"-- {(time.time() - start_time)} seconds --"
+        )
+        if self.currentModel is self.checkModel:
+            self.loadPackagesCheck()
+
+    @staticmethod
+    def loadLimit() -> int:
+        """packages loaded, -1 for all"""
+        if "--mini" in sys.argv:
+            return int(os.environ.get("MINI", 100))
+        return -1
 
+    def setSourceModel(self, file_name):
+        """load database in background, packages are added by blocks"""
         if file_name.exists():
             print("\n:: Load Database...")
-            start_time = time.time()
-            self.proxyModel.inject(load_json())
-            if not self.proxyModel.rowCount():
-                exit(3)
-            print(f"json to data duration: -- {(time.time() - start_time)} seconds --")
-            self.parent.setWindowTitle(
-                f"{_('AUR list')} - {self.proxyModel.rowCount()}"
+            limit = self.loadLimit()
+            self.loading = True
+            self.load_time = time.time()
+            # lazy mode: descriptions are not loaded, not indexed
+            lazy = self.config.attributes["lazy"]
+            self.proxyModel.clear(not lazy)
+            self.enableTextSearch(not lazy)
+            worker = widgets.LoadWorker(
+                self.onPackagesLoaded,
+                self.onLoadFinished,
+                self.config,
+                limit,
+                self.proxyModel.search_index,
             )
+            self.parent.threadpool.start(worker)
+
+    def enableTextSearch(self, enabled: bool):
+        """search in descriptions decodes all records in lazy mode: disabled"""
+        items = self.filterSyntaxComboBox.model()
+        for target in models.packageModel.TEXT_TARGETS:
+            items.item(target).setEnabled(enabled)
+        if not enabled and (
+            self.filterSyntaxComboBox.currentIndex() in models.packageModel.TEXT_TARGETS
+        ):
+            self.filterSyntaxComboBox.setCurrentIndex(0)
+
+    @QtCore.pyqtSlot(object)
+    def onPackagesLoaded(self, packages: list[Package]):
+        self.proxyModel.appendPackages(packages)
+        self.parent.statusBar().showMessage(
+            f"{_('Load')}: {len(self.proxyModel._origin)} {_('Packages')}..."
+        )
+        self.parent.setWindowTitle(
+            f"{_('AUR list')} - {len(self.proxyModel._origin)} - {self.proxyModel.rowCount()}"
+        )
+
+    @QtCore.pyqtSlot(int)
+    def onLoadFinished(self, count: int):
+        self.loading = False
+        self.parent.statusBar().clearMessage()
+        if not self.proxyModel._origin:
+            exit(3)
+        print(f"json to data duration: -- {(time.time() - self.load_time)} seconds --")
+        self.completer_model.inject(p.name for p in self.proxyModel._origin)
+        if self.proxyModel._sort:
+            # user sort while loading
+            header = self.sourceView.header()
+            self.sourceView.sortByColumn(
+                header.sortIndicatorSection(), header.sortIndicatorOrder()
+            )
+        else:
             self.sourceView.sortByColumn(2, QtCore.Qt.AscendingOrder)
+        if self.proxyModel.ranked():  # loaded packages were not ranked
+            self.textFilterChanged()
+        if self.reload:
+            self.reload = False
+            self.loadPackages()
 
 
 def run(config):
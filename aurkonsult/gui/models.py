@@ -1,19 +1,74 @@
 import sys
 import time
+from bisect import bisect_left
+from collections import OrderedDict
+from operator import attrgetter
 from typing import Any
 from PyQt5 import QtCore, QtGui, QtWidgets
 from aurkonsult import Package
+from aurkonsult.core import LOCAL_FIELDS
+from aurkonsult.database import ChangeSet, LocalJoin, join_local
+from aurkonsult.search import Query, QueryCache, SearchIndex
+from aurkonsult.search import FUZZY, QUERY, RANKED, dep_name, terms, words
+from aurkonsult.query import parse as parse_query
+from aurkonsult.search import fuzzy_distance, fuzzy_rank
+
+
+class displayCache:
+    """formatted values of packages, cells are painted without strftime/urlparse"""
+
+    SIZE = 4096  # values, more than visible rows
+    FORMATS = {"tooltip": lambda pkg: f"{pkg.name} {pkg.version}"}
+
+    def __init__(self):
+        self._values: OrderedDict[tuple[Package, str], str] = OrderedDict()
+
+    def get(self, pkg: Package, spec: str) -> str:
+        """value of f"{pkg:spec}" or of FORMATS[spec]"""
+        key = (pkg, spec)
+        try:
+            self._values.move_to_end(key)
+            return self._values[key]
+        except KeyError:
+            pass
+        if formatter := self.FORMATS.get(spec):
+            value = formatter(pkg)
+        else:
+            value = format(pkg, spec)
+        self._values[key] = value
+        if len(self._values) > self.SIZE:
+            self._values.popitem(last=False)
+        return value
+
+    def clear(self):
+        """packages updated (originChanged) or locale changed: dates are localized
+        QEvent.LocaleChange is caught by Window.changeEvent, not here"""
+        self._values.clear()
 
 
 class ModelBase(QtCore.QAbstractItemModel):
     """Absract class aur packages container"""
 
     _HEADERS = []
+    SEARCH_BLOCK = 4096  # test if search is cancelled after each block
 
     def __init__(self, parent, *args):
         super().__init__(parent, *args)
         self._data = []
         self._origin = []
+        self._sort = None  # (key, reverse) of last sort
+        self._match = None  # predicate of last filter
+        self._query: Query | None = None  # query of last filter
+        self.search_index: SearchIndex | None = None
+        self.queries = QueryCache()  # clear if _origin changes
+        self.generation = 0  # +1 if _origin changes
+        # (column, reverse): _origin sorted, and index of packages in this order
+        self._orders: dict[tuple[str, bool], list[Package]] = {}
+        self._ranks: dict[tuple[str, bool], dict[Package, int]] = {}
+        self._names: dict[str, Package] | None = None  # name: package of _origin
+        self.display = displayCache()
+        self._status: dict[Package, int] = {}  # Package.status() flags
+        self.time_since_update = 0  # for flag NEW
 
     def data(self, index, role=QtCore.Qt.DisplayRole):
         if not index.isValid():
@@ -22,6 +77,34 @@ class ModelBase(QtCore.QAbstractItemModel):
     def inject(self, datas):
         self._data = []
         self._origin = list(datas)
+        self.originChanged()
+
+    def originChanged(self):
+        """packages added or removed: old searches and sorts are not valid"""
+        self.queries.clear()
+        self._orders.clear()
+        self._ranks.clear()
+        self._names = None
+        self.display.clear()
+        self.generation += 1
+
+    def byName(self) -> dict[str, Package]:
+        """index name: package of _origin, build once by origin"""
+        if self._names is None:
+            self._names = {pkg.name: pkg for pkg in self._origin}
+        return self._names
+
+    def updateStatus(self, packages):
+        """compute flags of packages, delegates only read them"""
+        since = self.time_since_update
+        self._status.update((pkg, pkg.status(since)) for pkg in packages)
+
+    def status(self, pkg: Package) -> int:
+        try:
+            return self._status[pkg]
+        except KeyError:
+            self.updateStatus((pkg,))
+            return self._status[pkg]
 
     def headerData(self, section, orientation, role) -> str:
         if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
@@ -29,6 +112,8 @@ class ModelBase(QtCore.QAbstractItemModel):
         return ""
 
     def rowCount(self, index=None) -> int:
+        if index is not None and index.isValid():
+            return 0  # list, not a tree
         return len(self._data)
 
     def columnCount(self, index=None) -> int:
@@ -53,36 +138,242 @@ class ModelBase(QtCore.QAbstractItemModel):
 
     def sort(self, column, order):
         key = self._HEADERS[column]
-        csort = lambda t: t[key]
-        self.layoutAboutToBeChanged.emit()
+        self._sort = (key, order == 0)
         try:
-            self._data = sorted(self._data, key=csort, reverse=(order == 0))
+            self.setRows(self.sortPackages(self._data, key, order == 0))
         except:
             print(f"Error sort: {key}")
             raise
-        self.layoutChanged.emit()
 
-    def filterPkg(self, regex: str, dep_wants: set[str], dep_nones: set[str], target=1):
+    def setRows(self, packages: list[Package]):
+        """new rows of view, one layout change
+        persistent indexes (selection, current) follow their packages"""
         self.layoutAboutToBeChanged.emit()
-        lists = self._origin
+        olds = self.persistentIndexList()
+        self._data = packages
+        if olds:
+            rows = {pkg: row for row, pkg in enumerate(packages)}
+            root = QtCore.QModelIndex()
+            self.changePersistentIndexList(
+                olds,
+                [
+                    self.index(rows[pkg], index.column(), root)
+                    if (pkg := index.internalPointer()) in rows
+                    else QtCore.QModelIndex()
+                    for index in olds
+                ],
+            )
+        self.layoutChanged.emit()
 
-        if dep_nones:
-            lists = (pkg for pkg in lists if set(pkg.depends).isdisjoint(dep_nones))
-        if dep_wants:
-            lists = (pkg for pkg in lists if dep_wants.issubset(pkg.depends))
+    def order(self, key: str, reverse=False) -> list[Package]:
+        """all packages sorted by column, cached until _origin changes
+        stable: equal values stay in order of _origin, also if `reverse`"""
+        if (order := self._orders.get((key, reverse))) is None:
+            values = list(map(attrgetter(key), self._origin))
+            indexes = sorted(
+                range(len(values)), key=values.__getitem__, reverse=reverse
+            )
+            order = self._orders[key, reverse] = [self._origin[i] for i in indexes]
+        return order
+
+    def sortPackages(
+        self, packages: list[Package], key: str, reverse=False
+    ) -> list[Package]:
+        """packages in column order, read in cached order of all packages"""
+        order = self.order(key, reverse)
+        if len(packages) > len(order) // 8:
+            wanted = set(packages)
+            result = [pkg for pkg in order if pkg in wanted]
+        else:
+            if (ranks := self._ranks.get((key, reverse))) is None:
+                ranks = {pkg: i for i, pkg in enumerate(order)}
+                self._ranks[key, reverse] = ranks
+            result = sorted(packages, key=lambda pkg: ranks.get(pkg, -1))
+            if result and result[0] not in ranks:
+                result = []
+        if len(result) != len(packages):
+            # packages not in _origin (checkModel)
+            result = sorted(packages, key=attrgetter(key), reverse=reverse)
+        return result
 
-        if regex == "":
-            self._data = list(lists)
+    def filterPkg(self, regex: str, dep_wants: set[str], dep_nones: set[str], target=1):
+        match = self.matcher(regex, dep_wants, dep_nones, target)
+        query = self.query(regex, dep_wants, dep_nones, target)
+        self.setFilter(query, match, self.search(query, match) if match else None)
+
+    def setFilter(self, query: Query, match, result: list[Package] | None):
+        """publish a search result, one layout change"""
+        self._match = match
+        self._query = query if match else None
+        if match:
+            self.queries.put(query, result)
         else:
-            regex = regex.casefold()
+            result = self._origin
+        if self._sort and not query.ranked():  # keep sort of view
+            result = self.sortPackages(result, *self._sort)
+        self.setRows(list(result) if result is self._origin else result)
+
+    def resetFilter(self):
+        """all packages, in order of last sort"""
+        self._match = None
+        self._query = None
+        result = self._origin
+        if self._sort:
+            result = self.sortPackages(result, *self._sort)
+        self.setRows(list(result) if result is self._origin else result)
+
+    @staticmethod
+    def query(regex: str, dep_wants: set[str], dep_nones: set[str], target=1) -> Query:
+        return Query(
+            regex.casefold(),
+            frozenset(map(dep_name, dep_wants)),
+            frozenset(map(dep_name, dep_nones)),
+            target,
+        )
+
+    def search(self, query: Query, match, cancelled=None) -> list[Package] | None:
+        """packages found by query, filter the smallest list we have
+        can run in a thread: return None if `cancelled()`"""
+        if (result := self.queries.get(query)) is not None:
+            return result
+        if query.target == QUERY:  # match is a query.Filter, filter by columns
+            packages = self._origin
+            if index := self.search_index:
+                with index.lock:  # loader can add packages
+                    if (positions := match.positions(index)) is not None:
+                        packages = index.packages_at(positions)
+            return match.select(packages, cancelled)
+        packages = self.queries.base(query)
+        if packages is None and self.search_index:
+            packages = self.search_index.candidates(query)
+            if packages is not None:  # dependencies are already filtered by index
+                match = self.matcher(query.text, set(), set(), query.target)
+                match = match or (lambda pkg: True)
+        if packages is None:
+            packages = self._origin
+        result = []
+        for start in range(0, len(packages), self.SEARCH_BLOCK):
+            if cancelled and cancelled():
+                return None
+            result.extend(filter(match, packages[start : start + self.SEARCH_BLOCK]))
+        if query.target == FUZZY and query.text:
+            result.sort(key=fuzzy_rank(query.text))
+        return result
+
+    @staticmethod
+    def matcher(regex: str, dep_wants: set[str], dep_nones: set[str], target=1):
+        """predicate for filter packages, None if not filter
+        ValueError if target is QUERY and regex not valid"""
+        if not regex and not dep_wants and not dep_nones:
+            return None
+        if target == QUERY:
+            deps = [f'depends:"{dep}"' for dep in dep_wants]
+            deps += [f'-depends:"{dep}"' for dep in dep_nones]
+            return parse_query(" ".join((regex, *deps)))
+        regex = regex.casefold()
+        dep_wants = {dep_name(dep) for dep in dep_wants}
+        dep_nones = {dep_name(dep) for dep in dep_nones}
+        query_words = words(regex)
+        query_terms = set(terms(regex))
+
+        def match(pkg: Package) -> bool:
+            if dep_wants or dep_nones:
+                depends = {dep_name(dep) for dep in pkg.depends}
+                if not depends.isdisjoint(dep_nones):
+                    return False
+                if not dep_wants.issubset(depends):
+                    return False
+            if regex == "":
+                return True
             if target == 0:
-                self._data = [pkg for pkg in lists if regex in pkg.name.lower()]
+                return regex in pkg.name.casefold()
+            if target == FUZZY:
+                return fuzzy_distance(query_words, pkg.name) is not None
+            if target == RANKED:  # not ranked here, see SearchIndex.ranked()
+                text = f"{pkg.name} {pkg.description} {' '.join(pkg.keywords)}"
+                return not query_terms.isdisjoint(terms(text))
+            return regex in f"{pkg.name} {pkg.description}".casefold()
+
+        return match
+
+    def sortedRow(self, pkg: Package) -> int:
+        """row for insert a package with last sort order"""
+        if not self._sort:
+            return len(self._data)
+        key, reverse = self._sort
+        value = pkg[key]
+        low, high = 0, len(self._data)
+        while low < high:
+            mid = (low + high) // 2
+            other = self._data[mid][key]
+            if (value > other) if reverse else (value < other):
+                high = mid
             else:
-                self._data = []
-                for pkg in lists:
-                    if regex in f"{pkg.name} {pkg.description}".casefold():
-                        self._data.append(pkg)
-        self.layoutChanged.emit()
+                low = mid + 1
+        return low
+
+    def ranked(self) -> bool:
+        """rows are in order of a fuzzy or ranked search, not in column order"""
+        return self._query is not None and self._query.ranked()
+
+    def removeRowsAt(self, rows: list[int]):
+        """remove by blocks of consecutive rows, from the end"""
+        root = QtCore.QModelIndex()
+        rows = sorted(rows)
+        while rows:
+            last = first = rows.pop()
+            while rows and rows[-1] == first - 1:
+                first = rows.pop()
+            self.beginRemoveRows(root, first, last)
+            del self._data[first : last + 1]
+            self.endRemoveRows()
+
+    def rowsChanged(self, rows: list[int]):
+        """one dataChanged by block of consecutive rows"""
+        root = QtCore.QModelIndex()
+        last_column = self.columnCount() - 1
+        rows = sorted(rows)
+        first = 0
+        for i in range(1, len(rows) + 1):
+            if i == len(rows) or rows[i] != rows[i - 1] + 1:
+                self.dataChanged.emit(
+                    self.index(rows[first], 0, root),
+                    self.index(rows[i - 1], last_column, root),
+                )
+                first = i
+
+    def refreshRows(self, packages: list[Package], keys=None):
+        """values of packages changed: filter and sort them again
+        rows not moved are only repainted; a ranked view only loses rows
+        `keys`: fields changed, rows can move only if sorted by one of them"""
+        if self._data is self._origin:
+            self._data = list(self._data)
+        changed = set(packages)
+        rows = [i for i, p in enumerate(self._data) if p in changed]
+        shown = {self._data[i] for i in rows}
+        moved = bool(self._sort) and not self.ranked()
+        if keys is not None and self._sort and self._sort[0] not in keys:
+            moved = False
+        keep, remove = [], []
+        for row in rows:
+            if moved or (self._match and not self._match(self._data[row])):
+                remove.append(row)
+            else:
+                keep.append(row)
+        self.rowsChanged(keep)
+        self.removeRowsAt(remove)
+        if self.ranked():  # not ranked with the others, found by next search
+            return
+        root = QtCore.QModelIndex()
+        for pkg in packages:
+            if pkg in shown and not moved:
+                continue
+            if self._match and not self._match(pkg):
+                continue
+            row = self.sortedRow(pkg)
+            self.beginInsertRows(root, row, row)
+            self._data.insert(row, pkg)
+            self.endInsertRows()
 
     def mimeTypes(self):
         return ["text/plain", "text/uri-list"]
@@ -127,40 +418,29 @@ class ModelBase(QtCore.QAbstractItemModel):
 
 class checkModel(ModelBase):
     """treeview Compare packages, local to aur"""
+    statusRole = QtCore.Qt.UserRole + 4
     ID_NAME, ID_LOCAL_VERSION, ID_VERSION, ID_DATE, ID_DESC = range(5)
     _HEADERS = ("name", "version_local", "version", "last_modified", "description")
+    ROLES = {QtCore.Qt.DisplayRole, QtCore.Qt.ToolTipRole, statusRole}
 
-    def inject(self, datas, user_aurs):
+    def inject(self, datas, user_aurs, names: dict[str, Package] | None = None):
+        """`names` is index name: package of `datas`, built here if None"""
         super().inject(datas)
         self.pkg_installeds = user_aurs
+        self.joined: LocalJoin | None = None
         if not self.pkg_installeds:
             return
 
-        short = [p for p in self.pkg_installeds.keys()]
-        self._data = [p for p in self._origin if p.name in short]
-        for pkg in self._data:
-            if pkg.name in short:
-                pkg.set_version_local(self.pkg_installeds[pkg.name][1])
-        pkg_last = {p.name: p.version for p in self._data if p.name in short}
-
-        for _, pkg in self.pkg_installeds.items():
-            try:
-                _ = pkg_last[pkg[0]]
-            except KeyError:
-                # pkg is not in aur, add new to list
-                package = Package()
-                {
-                    "Name": pkg[0],
-                    "VersionLocal": pkg[1],
-                    "Description": pkg[2],
-                    "URL": pkg[3],
-                } >> package
-                self._data.append(package)
+        if names is not None:
+            self._names = names
+        self.joined = join_local(self.byName(), self.pkg_installeds)
+        self._data = self.joined.installed + self.joined.missing
+        self._status = {}
+        self.updateStatus(self._data)
 
     def data(self, index, role=QtCore.Qt.DisplayRole):
-        if not index.isValid():
-            return None
-        super().data(index, role)
+        if role not in self.ROLES or not index.isValid():
+            return None  # font, colors...: called for each painted cell
         pkg: Package = index.internalPointer()
         if not pkg:
             pkg = self._data[index.row()]
@@ -169,7 +449,7 @@ class checkModel(ModelBase):
             case QtCore.Qt.DisplayRole:
                 match index.column():
                     case self.ID_DATE:
-                        return f"{pkg:LastModified}"
+                        return self.display.get(pkg, "LastModified")
                     case self.ID_VERSION if not pkg.version:
                         return " ❌"  # 🔴 ❌
                 return pkg[self._HEADERS[index.column()]]
@@ -186,6 +466,9 @@ class checkModel(ModelBase):
                 else:
                     return f"{pkg.name} not exists in Aur!"
 
+            case self.statusRole:
+                return self.status(pkg)
+
         """if role == QtCore.Qt.DecorationRole:
             # TODO ? if installed user-bookmarks-symbolic
             if index.column() == self.ID_VERSION and not pkg.version:
@@ -207,17 +490,28 @@ class packageModel(ModelBase):
     https://doc.qt.io/qt-5/qabstractitemmodel.html
     """
 
+    TEXT_TARGETS = (1, RANKED)  # search in descriptions, disabled in lazy mode
     nameRole = QtCore.Qt.UserRole + 1  # 257
     versionRole = QtCore.Qt.UserRole + 2
     urlRole = QtCore.Qt.UserRole + 3
+    statusRole = QtCore.Qt.UserRole + 4
     matchRole = QtCore.Qt.UserRole + 100
     ID_NAME, ID_VERSION, ID_DATE, ID_URL, ID_DESC = range(5)
     _HEADERS = ("name", "version", "last_modified", "url", "description")
+    ROLES = {
+        QtCore.Qt.DisplayRole,
+        QtCore.Qt.ToolTipRole,
+        urlRole,
+        nameRole,
+        statusRole,
+    }
 
     def inject(self, datas):
         # self.layoutAboutToBeChanged.emit()
         super().inject(datas)
         self._data = self._origin
+        self.search_index = SearchIndex()
+        self.search_index.add(self._origin)
         # self.layoutChanged.emit()
 
     def headerData(self, section, orientation, role):
@@ -229,12 +523,8 @@ class packageModel(ModelBase):
         return None
 
     def data(self, index, role=QtCore.Qt.DisplayRole) -> str | None:
-        if not index.isValid():
-            return None
-        super().data(index, role)
-        if not index.isValid():
-            print("data(): not index.isValid")
-            return None
+        if role not in self.ROLES or not index.isValid():
+            return None  # font, colors...: called for each painted cell
 
         pkg: Package
         if index.internalPointer():
@@ -245,27 +535,156 @@ class packageModel(ModelBase):
         match role:
             case QtCore.Qt.DisplayRole:
                 if index.column() == self.ID_URL:
-                    return f"{pkg:hostname}"
+                    return self.display.get(pkg, "hostname")
                 if index.column() == self.ID_DATE:
-                    return f"{pkg:LastModified}"
+                    return self.display.get(pkg, "LastModified")
 
                 return self.pkgVal(
                     pkg, index.column()
                 )
 
             case QtCore.Qt.ToolTipRole:
-                return f"{pkg.name} {pkg.version}"
+                return self.display.get(pkg, "tooltip")
             case self.urlRole:
                 return pkg.url
             case self.nameRole:
                 return pkg.name
+            case self.statusRole:
+                return self.status(pkg)
 
         return None
 
     def filterNews(self, time_since_update: int):
-        self.layoutAboutToBeChanged.emit()
-        self._data = [p for p in self._origin if p.first_submitted > time_since_update]
-        self.layoutChanged.emit()
+        self._match = lambda p: p.first_submitted > time_since_update
+        self._query = None
+        self.setRows([p for p in self._origin if self._match(p)])
+
+    def clear(self, full=True):
+        """empty model, loader must add packages in search_index
+        not `full` (lazy mode): descriptions and dependencies are not indexed"""
+        self.beginResetModel()
+        self._origin = []
+        self._data = []
+        self._sort = None
+        self._match = None
+        self._query = None
+        self._status = {}
+        self.search_index = SearchIndex(full)
+        self.originChanged()
+        self.endResetModel()
+
+    def appendPackages(self, packages: list[Package]):
+        """progressive load: add at end, only visible if pass current filter"""
+        if self._data is self._origin:
+            self._data = list(self._data)
+        self._origin.extend(packages)
+        self.originChanged()
+        self.updateStatus(packages)
+        if self.search_index:
+            self.search_index.publish(len(packages))  # indexed by loader
+        if self.ranked():
+            return  # not in rank order: search again at end of load
+        if self._match:
+            packages = [pkg for pkg in packages if self._match(pkg)]
+        if packages:
+            row = len(self._data)
+            self.beginInsertRows(QtCore.QModelIndex(), row, row + len(packages) - 1)
+            self._data.extend(packages)
+            self.endInsertRows()
+
+    def applyChanges(self, changes: ChangeSet):
+        """apply database update, only rows modified; Package objects are kept"""
+        if self._data is self._origin:
+            self._origin = list(self._origin)
+        self.originChanged()
+
+        if changes.removed:
+            if self.search_index:
+                self.search_index.remove(
+                    p for p in self._origin if p.id in changes.removed
+                )
+            for pkg in self._origin:
+                if pkg.id in changes.removed:
+                    self._status.pop(pkg, None)
+            self._origin = [p for p in self._origin if p.id not in changes.removed]
+            self.removeRowsAt(
+                [i for i, p in enumerate(self._data) if p.id in changes.removed]
+            )
+
+        # all packages now use the new store, old store is released
+        for pkg in self._origin:
+            if new := changes.packages.get(pkg.id):
+                pkg.update(new)
+        if changes.changed:
+            changed = [p for p in self._origin if p.id in changes.changed]
+            self.updateStatus(changed)
+            if self.search_index:
+                self.search_index.update(changed)
+            self.refreshRows(changed)
+
+        self.updateStatus(changes.added)
+        if self.search_index:
+            self.search_index.add(changes.added)
+        self._origin.extend(changes.added)
+        self.refreshRows(changes.added)
+
+    def applyLocal(self, versions: dict[str, str]) -> list[Package]:
+        """installed packages changed, `versions` is name: local version ("" removed)
+        only these packages and their rows are updated"""
+        names = self.byName()
+        packages = [names[name] for name in versions if name in names]
+        if not packages:
+            return packages
+        for pkg in packages:
+            pkg.set_version_local(versions[pkg.name])
+        self.updateStatus(packages)
+        # results of `installed:` queries and local sorts are not valid
+        self.queries.clear()
+        for key in LOCAL_FIELDS:
+            for reverse in (False, True):
+                self._orders.pop((key, reverse), None)
+                self._ranks.pop((key, reverse), None)
+        # filtered again (`installed:`), repainted by runs of rows
+        self.refreshRows(packages, LOCAL_FIELDS)
+        return packages
+
+
+class completerModel(QtCore.QAbstractListModel):
+    """names starting by a prefix, found by bisect in all names sorted"""
+
+    SIZE = 50  # names displayed by completer
+
+    def __init__(self, parent, *args):
+        super().__init__(parent, *args)
+        self._keys = []  # casefold names, sorted
+        self._names = []
+        self._rows = []  # names displayed
+
+    def inject(self, names):
+        """build once by load, not by search"""
+        pairs = sorted((name.casefold(), name) for name in names)
+        self._keys = [key for key, _ in pairs]
+        self._names = [name for _, name in pairs]
+
+    def setPrefix(self, prefix: str):
+        rows = []
+        if prefix := prefix.casefold():
+            start = bisect_left(self._keys, prefix)
+            for i in range(start, min(start + self.SIZE, len(self._keys))):
+                if not self._keys[i].startswith(prefix):
+                    break
+                rows.append(self._names[i])
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
+
+    def rowCount(self, index=None) -> int:
+        return len(self._rows)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if index.isValid() and role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return self._rows[index.row()]
+        return None
 
 
 class listDelegate(QtWidgets.QStyledItemDelegate):
@@ -274,6 +693,7 @@ class listDelegate(QtWidgets.QStyledItemDelegate):
     OUTOFDATE = QtGui.QColor(160, 0, 0, 220)  # QtGui.QColor("salmon")
     # GREEN = QtGui.QColor(0, 60, 0, 220)    # QtGui.QColor("green")
     NOW = time.time() - (3600 * 72)
+    STYLED = (packageModel.ID_NAME, packageModel.ID_VERSION, packageModel.ID_DATE)
 
     def __init__(self, parent, time_since_update: int):
         super().__init__(parent)
@@ -288,18 +708,15 @@ class listDelegate(QtWidgets.QStyledItemDelegate):
         if not index.isValid():
             return None
         super(listDelegate, self).initStyleOption(option, index)
-        pkg: Package
-        if index.internalPointer():
-            pkg = index.internalPointer()
-        else:
-            pkg = self._data[index.row()]
-        if not pkg:
-            return
-        if index.data(QtCore.Qt.DisplayRole):
+        if option.text:  # set by super(), not formatted again
             if self.hfont < 0:
                 self.hfont = option.font.pointSize()
             option.font.setPointSize(self.hfont)
-            if index.column() == packageModel.ID_NAME and pkg.is_installed():
+            if index.column() not in self.STYLED:
+                return
+            # not by index.data(statusRole): no call by Qt
+            status = index.model().status(index.internalPointer())
+            if index.column() == packageModel.ID_NAME and status & Package.INSTALLED:
                 # can change color to red if pkg.vercmp > 1 == new version available ?
                 option.palette.setBrush(
                     QtGui.QPalette.Text, QtGui.QPalette().highlight()
@@ -308,12 +725,12 @@ class listDelegate(QtWidgets.QStyledItemDelegate):
                 # TODO change cursor, text deco.. ?
                 pass"""
             if index.column() == packageModel.ID_VERSION:
-                if -pkg:  # is outofdate
+                if status & Package.OUT_OF_DATE:
                     option.palette.setBrush(QtGui.QPalette.Text, self.OUTOFDATE)
                     option.font.setBold(True)
                 return
             if index.column() == packageModel.ID_DATE:
-                if pkg.first_submitted > self.time_since_update:
+                if status & Package.NEW:
                     option.palette.setBrush(
                         QtGui.QPalette.Text, QtGui.QPalette().highlight()
                     )
@@ -340,6 +757,7 @@ class checkDelegate(QtWidgets.QStyledItemDelegate):
     """Howto display treeview : check differences local/aur"""
 
     OUTOFDATE = QtGui.QColor(160, 0, 0, 220)  # QtGui.QColor("salmon")
+    STYLED = (checkModel.ID_VERSION, checkModel.ID_LOCAL_VERSION)
 
     def __init__(self, parent):
         super().__init__(parent)
@@ -350,28 +768,24 @@ class checkDelegate(QtWidgets.QStyledItemDelegate):
         if not index.isValid():
             return None
         super(checkDelegate, self).initStyleOption(option, index)
-        pkg = None
-        if index.internalPointer():
-            pkg = index.internalPointer()
-        else:
-            pkg = self._data[index.row()]
-        if not pkg:
-            return
-        if index.data(QtCore.Qt.DisplayRole):
+        if option.text:  # set by super(), not formatted again
             if self.hfont < 0:
                 self.hfont = option.font.pointSize()
             option.font.setPointSize(self.hfont)
+            if index.column() not in self.STYLED:
+                return
+            status = index.model().status(index.internalPointer())
             if index.column() == checkModel.ID_VERSION:
-                if -pkg or pkg.version == "":
+                if status & (Package.OUT_OF_DATE | Package.NOT_IN_AUR):
                     option.palette.setBrush(QtGui.QPalette.Text, self.OUTOFDATE)
                     # option.font.setBold(True)
-                elif pkg > "aur":
+                elif status & Package.AUR_NEWER:
                     option.palette.setBrush(
                         QtGui.QPalette.Text, QtGui.QPalette().highlight()
                     )
                 return
             if index.column() == checkModel.ID_LOCAL_VERSION:
-                if pkg < "aur":
+                if status & Package.LOCAL_NEWER:
                     option.palette.setBrush(
                         QtGui.QPalette.Text, QtGui.QPalette().highlight()
                     )
@@ -4,6 +4,7 @@ import time
 from PyQt5 import QtCore, QtGui, QtWidgets, QtDBus
 from ..config import Configuration, UserConf
 from aurkonsult import api
+from aurkonsult import database
 from aurkonsult import _
 
 
@@ -80,15 +81,23 @@ class packageTree(QtWidgets.QTreeView):
 
 class WorkerSignal(QtCore.QObject):
     finished = QtCore.pyqtSignal(int)
+    progress = QtCore.pyqtSignal(int, int, float)  # bytes read, bytes total, bytes/s
+    changes = QtCore.pyqtSignal(object)  # database.ChangeSet
+    packages = QtCore.pyqtSignal(object)  # list[Package], block of loaded packages
+    found = QtCore.pyqtSignal(int, object)  # search id, list[Package]
 
 
 class Worker(QtCore.QRunnable):
     """backgound download database"""
 
-    def __init__(self, fn_callback, config: Configuration):  # , *args, **kwargs):
+    def __init__(
+        self, fn_callback, config: Configuration, fn_progress=None
+    ):  # , *args, **kwargs):
         super(Worker, self).__init__()
         self.signal = WorkerSignal()
         self.signal.finished.connect(fn_callback)
+        if fn_progress:
+            self.signal.progress.connect(fn_progress)
         self.config = config
         # self.args = args
         # self.kwargs = kwargs
@@ -99,13 +108,100 @@ class Worker(QtCore.QRunnable):
         )
         try:
             ret = api.download(
-                self.config.db_file, self.config.url, self.config.db_time
+                self.config.db_file,
+                self.config.url,
+                self.config.db_time,
+                self.config.db_meta,
+                self.signal.progress.emit,
             )
         finally:
             QtWidgets.QApplication.instance().restoreOverrideCursor()
         self.signal.finished.emit(ret)
 
 
+class LoadWorker(QtCore.QRunnable):
+    """background load database, packages are sent by blocks"""
+
+    def __init__(
+        self, fn_packages, fn_callback, config: Configuration, limit=-1, index=None
+    ):
+        super(LoadWorker, self).__init__()
+        self.signal = WorkerSignal()
+        self.signal.packages.connect(fn_packages)
+        self.signal.finished.connect(fn_callback)
+        self.config = config
+        self.limit = limit
+        self.index = index  # SearchIndex filled here, not in gui thread
+
+    def run(self):
+        count = 0
+        try:
+            for packages in database.iter_packages(
+                self.config.db_file,
+                self.config.db_snapshot,
+                self.config.user_aurs,
+                self.limit,
+                self.config.attributes["lazy"],
+                self.config.jobs,
+            ):
+                count += len(packages)
+                if self.index is not None:
+                    self.index.add(packages, publish=False)
+                self.signal.packages.emit(packages)
+        finally:
+            self.signal.finished.emit(count)
+
+
+class SearchWorker(QtCore.QRunnable):
+    """background search in a model, result is not sent if cancelled"""
+
+    def __init__(self, fn_callback, model, query, match, search_id: int):
+        super(SearchWorker, self).__init__()
+        self.signal = WorkerSignal()
+        self.signal.found.connect(fn_callback)
+        self.model = model
+        self.query = query
+        self.match = match
+        self.search_id = search_id
+        self.generation = model.generation  # packages of model when started
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        result = self.model.search(self.query, self.match, lambda: self.cancelled)
+        if result is not None and not self.cancelled:
+            self.signal.found.emit(self.search_id, result)
+
+
+class DiffWorker(QtCore.QRunnable):
+    """background compare new database with packages loaded"""
+
+    def __init__(
+        self, fn_callback, config: Configuration, packages: list, limit=-1
+    ):
+        super(DiffWorker, self).__init__()
+        self.signal = WorkerSignal()
+        self.signal.changes.connect(fn_callback)
+        self.config = config
+        self.packages = packages
+        self.limit = limit  # same as LoadWorker, else all others are "added"
+
+    def run(self):
+        changes = database.diff_packages(
+            self.packages,
+            database.load_packages(
+                self.config.db_file,
+                self.config.db_snapshot,
+                self.config.user_aurs,
+                self.limit,
+                jobs=self.config.jobs,
+            ),
+        )
+        self.signal.changes.emit(changes)
+
+
 def run_konsole(pkg_name, use_pamac=False):
     if not pkg_name or not Configuration.KONSOLE_INSTALLED:
         return
@@ -215,6 +311,7 @@ class ConfigDialog(QtWidgets.QDialog):
             "history": QtWidgets.QCheckBox(_("History")),
             "pamac": QtWidgets.QCheckBox("pamac"),
             "homecache": QtWidgets.QCheckBox("user home cache"),
+            "lazy": QtWidgets.QCheckBox(_("details on demand")),
         }
         if not Configuration.USER_CONF_FILE.exists():
             Configuration.USER_CONF_FILE.touch()
@@ -251,6 +348,11 @@ class ConfigDialog(QtWidgets.QDialog):
         )
         grid.addWidget(self.form["homecache"], 4, 1)
 
+        grid.addWidget(
+            QtWidgets.QLabel(_("Fast start") + ":"), 5, 0, QtCore.Qt.AlignRight
+        )
+        grid.addWidget(self.form["lazy"], 5, 1)
+
         formGroupBox = QtWidgets.QGroupBox(_("Preferences"))
         formGroupBox.setLayout(grid)
 
@@ -266,5 +368,7 @@ class ConfigDialog(QtWidgets.QDialog):
     def accept(self):
         "save prefs in file in user home"
         conf = UserConf(Configuration.USER_CONF_FILE)
-        conf.save({k: v.isChecked() for k, v in self.form.items()})
+        datas = conf.read()  # keep values not in this dialog
+        datas.update({k: v.isChecked() for k, v in self.form.items()})
+        conf.save(datas)
         super().accept()
@@ -0,0 +1,264 @@
+"""
+installed packages, read in pacman local database
+"""
+import gzip
+import io
+import os
+import pickle
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+LOCAL_DB = Path("/var/lib/pacman/local")
+SYNC_DB = Path("/var/lib/pacman/sync")
+CACHE_VERSION = 2  # change if LocalPackage fields or cache format change
+PARALLEL_MIN = 64  # less desc files are read in this thread
+CHUNK = 1 << 18  # bytes of a sync database decompressed by read
+
+
+class LocalPackage(NamedTuple):
+    """values of desc file, first fields are same as config.PkgDesc"""
+
+    name: str
+    version: str
+    description: str
+    url: str
+    validation: str  # "none": installed with no packager
+    installed_size: int
+    install_date: int
+    depends: tuple[str, ...]
+
+
+def parse_desc(file_name: Path) -> LocalPackage | None:
+    """desc file is blocks `%KEY%` + values, separated by empty line"""
+    try:
+        text = file_name.read_text(errors="replace")
+    except OSError:
+        return None
+    values = {}
+    for block in text.split("\n\n"):
+        key, _, value = block.strip("\n").partition("\n")
+        values[key] = value
+    if not values.get("%NAME%"):
+        return None
+    get = values.get
+    return LocalPackage(
+        get("%NAME%"),
+        get("%VERSION%", ""),
+        get("%DESC%", ""),
+        get("%URL%", ""),
+        get("%VALIDATION%", "").split("\n", 1)[0],
+        int(get("%SIZE%") or 0),
+        int(get("%INSTALLDATE%") or 0),
+        tuple(get("%DEPENDS%", "").split("\n")) if get("%DEPENDS%") else (),
+    )
+
+
+def read_sync_names(file_name: Path) -> frozenset[str] | None:
+    """names of packages in a sync database, None if archive can not be read
+    archive is a gzip tar, only headers are read: paths are `name-version-rel/desc`
+    (tarfile module is 50x slower, it creates an object by member)
+    archive is read by blocks of 512 bytes, member datas are skipped by seek"""
+    names = set()
+    long_name = b""
+    try:
+        with io.BufferedReader(gzip.open(file_name, "rb"), CHUNK) as fin:
+            while len(header := fin.read(512)) == 512:
+                if not header.strip(b"\0"):
+                    break  # end of archive
+                try:
+                    size = int(header[124:136].strip(b"\0 ") or b"0", 8)
+                except ValueError:
+                    print(f"Error: bad archive {file_name}")
+                    return None
+                padded = (size + 511) // 512 * 512
+                match header[156:157]:
+                    case b"L":  # gnu long name of next member
+                        long_name = fin.read(padded)[:size].rstrip(b"\0")
+                        continue
+                    case b"x":  # pax header, path of next member
+                        for record in fin.read(padded)[:size].split(b"\n"):
+                            if b" path=" in record:
+                                long_name = record.split(b" path=", 1)[1]
+                        continue
+                    case b"g":
+                        fin.seek(padded, os.SEEK_CUR)
+                        continue
+                fin.seek(padded, os.SEEK_CUR)
+                path = long_name or header[:100].split(b"\0", 1)[0]
+                long_name = b""
+                names.add(path.split(b"/", 1)[0])
+    except (OSError, EOFError, zlib.error) as err:  # zstd archive is not supported
+        print(f"Error: can not read {file_name}: {err}")
+        return None
+    return frozenset(name.decode().rsplit("-", 2)[0] for name in names)
+
+
+def _file_key(file_name: Path) -> tuple[int, int]:
+    stat = file_name.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class LocalDB:
+    """installed packages, a desc file is parsed again only if its mtime changed
+    ----
+    key is mtime of desc file and not of directory: `pacman -D` rewrites desc in place
+    """
+
+    def __init__(
+        self, path: Path = LOCAL_DB, cache: Path | None = None, sync: Path = SYNC_DB
+    ) -> None:
+        self.path = path
+        self.cache = cache
+        self.sync = sync
+        self.entries: dict[str, tuple[int, LocalPackage | None]] = {}  # dir: mtime, pkg
+        self.packages: dict[str, LocalPackage] = {}  # name: package
+        # sync database: (mtime, size), names; names None if archive not readable
+        self.syncs: dict[str, tuple[tuple[int, int], frozenset[str] | None]] = {}
+        self._repos: set[str] | None = None  # names in all sync databases
+        if cache:
+            self.read_cache()
+
+    def _scan(self) -> list[tuple[str, int]]:
+        """package directories and mtime of their desc"""
+        scan = []
+        try:
+            with os.scandir(self.path) as entries:
+                for entry in entries:
+                    try:
+                        scan.append(
+                            (entry.name, os.stat(f"{entry.path}/desc").st_mtime_ns)
+                        )
+                    except OSError:  # not a package directory or removed now
+                        continue
+        except OSError as err:
+            print(f"Error: can not read {self.path}: {err}")
+        return scan
+
+    def refresh(self) -> tuple[dict[str, LocalPackage], set[str]]:
+        """read only changed desc files
+        return packages added or changed and names removed since last refresh"""
+        start_time = time.time()
+        entries = {}
+        todo = []
+        for directory, mtime in self._scan():
+            old = self.entries.get(directory)
+            if old and old[0] == mtime:
+                entries[directory] = old
+            else:
+                todo.append((directory, mtime))
+        files = [self.path / directory / "desc" for directory, _ in todo]
+        if len(files) < PARALLEL_MIN:
+            parsed = list(map(parse_desc, files))
+        else:
+            with ThreadPoolExecutor() as pool:
+                parsed = list(pool.map(parse_desc, files))
+        for (directory, mtime), pkg in zip(todo, parsed):
+            entries[directory] = (mtime, pkg)
+
+        packages = {pkg.name: pkg for _, pkg in entries.values() if pkg}
+        changed = {
+            name: pkg for name, pkg in packages.items() if self.packages.get(name) != pkg
+        }
+        removed = set(self.packages) - set(packages)
+        updated = bool(todo) or len(entries) != len(self.entries)
+        self.entries = entries
+        self.packages = packages
+        if updated and self.cache:
+            self.write_cache()
+        print(
+            f"local database: {len(packages)} packages, {len(todo)} read, "
+            f"{len(changed)} changed, {len(removed)} removed "
+            f"-- {(time.time() - start_time)} seconds --"
+        )
+        return changed, removed
+
+    def repo_names(self) -> set[str] | None:
+        """names of packages in readable sync databases, None if no database
+        an archive is read again only if its mtime or size changed"""
+        syncs = {}
+        todo = []
+        for file_name in sorted(self.sync.glob("*.db")):
+            try:
+                key = _file_key(file_name)
+            except OSError:
+                continue
+            old = self.syncs.get(file_name.name)
+            if old and old[0] == key:
+                syncs[file_name.name] = old
+            else:
+                todo.append((file_name, key))
+        if todo:
+            start_time = time.time()
+            with ThreadPoolExecutor() as pool:  # zlib releases the GIL
+                parsed = list(pool.map(read_sync_names, (f for f, _ in todo)))
+            for (file_name, key), names in zip(todo, parsed):
+                syncs[file_name.name] = (key, names)  # None: not read again
+            print(
+                f"sync databases: {len(todo)} read "
+                f"-- {(time.time() - start_time)} seconds --"
+            )
+        if self._repos is None or syncs != self.syncs:
+            self._repos = set().union(*(names or () for _, names in syncs.values()))
+        if syncs != self.syncs:
+            self.syncs = syncs
+            if self.cache:
+                self.write_cache()
+        if not syncs:
+            return None
+        return self._repos
+
+    def unreadable(self) -> list[str]:
+        """sync databases not read: their packages are not known"""
+        return [repo for repo, (_, names) in self.syncs.items() if names is None]
+
+    def aur_packages(self) -> dict[str, LocalPackage]:
+        """foreign packages: installed and not in a sync database
+        not in a readable database and a database not read: installed with no packager
+        no sync database: only packages installed with no packager"""
+        if (repos := self.repo_names()) is None:
+            return {
+                name: pkg
+                for name, pkg in self.packages.items()
+                if pkg.validation == "none"
+            }
+        packages = {name: self.packages[name] for name in self.packages.keys() - repos}
+        if unreadable := self.unreadable():
+            print(f"Warning: not read {', '.join(unreadable)}, packager is checked")
+            packages = {
+                name: pkg for name, pkg in packages.items() if pkg.validation == "none"
+            }
+        return packages
+
+    def read_cache(self):
+        try:
+            with self.cache.open("rb") as fin:
+                datas = pickle.load(fin)
+            if datas["version"] != CACHE_VERSION or datas["path"] != str(self.path):
+                return
+            self.entries = datas["entries"]
+            self.syncs = datas["syncs"]
+        except FileNotFoundError:
+            return
+        except Exception as err:  # pickle can raise a lot of errors
+            print(f"Error: bad cache {self.cache}: {err!r}")
+            return
+        self.packages = {pkg.name: pkg for _, pkg in self.entries.values() if pkg}
+
+    def write_cache(self):
+        datas = {
+            "version": CACHE_VERSION,
+            "path": str(self.path),
+            "entries": self.entries,
+            "syncs": self.syncs,
+        }
+        tmp_file = self.cache.with_name(f"{self.cache.name}.part")
+        try:
+            with tmp_file.open("wb") as fout:
+                pickle.dump(datas, fout, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self.cache)
+        except OSError as err:
+            tmp_file.unlink(missing_ok=True)
+            print(f"Error: cache not saved {self.cache}: {err}")
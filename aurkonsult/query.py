@@ -0,0 +1,352 @@
+"""
+query language for filter packages, usable without gui
+
+    maintainer:foo votes>100 outofdate:yes modified<30d license:MIT name~qt
+
+condition is `field` `operator` `value`, all conditions must be true
+`-` before a condition is "not", a word alone is searched in name and description
+operators: `:` or `=` is equal, `~` contains, `<` `<=` `>` `>=` for numbers and dates
+dates are `2024-01-31` or an age: `30d` `2w` `6m` `1y`, modified<30d is "less than 30 days"
+an age is only compared: modified:30d is not valid
+a word with `:` and not a field (as an url) is a word alone
+"""
+import operator
+from abc import ABC, abstractmethod
+import re
+import shlex
+import time
+from datetime import datetime
+from typing import Callable
+from .core import Package
+from .store import PackageStore
+from .search import dep_name
+
+COMPARES = {
+    ":": operator.eq,
+    "=": operator.eq,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+REVERSES = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}  # for ages
+AGES = {"d": 86400, "w": 7 * 86400, "m": 30 * 86400, "y": 365 * 86400}
+
+_CONDITION = re.compile(r"(-?)([a-z_]+)(<=|>=|:|=|~|<|>)(.*)", re.S)
+_AGE = re.compile(r"(\d+)([dwmy])")
+
+
+class Condition(ABC):
+    """one field compared to a value, for a package or for rows of a store"""
+
+    def __init__(self, attr: str, op: str, value, negate=False) -> None:
+        self.attr = attr
+        self.op = op
+        self.value = value
+        self.negate = negate
+
+    @abstractmethod
+    def test(self, value) -> bool:
+        """compare a value of package"""
+
+    def match(self, pkg: Package) -> bool:
+        return self.test(getattr(pkg, self.attr)) is not self.negate
+
+    def rows(self, store: PackageStore) -> Callable[[list[int]], list[int]]:
+        """filter rows of store, values are read in columns"""
+        column, test, negate = getattr(store, self.attr), self.test, self.negate
+        return lambda rows: [row for row in rows if test(column[row]) is not negate]
+
+    def positions(self, index) -> set[int] | None:
+        """positions of packages in a SearchIndex, None if no index for this field"""
+        return None
+
+
+class NumberCondition(Condition):
+    def __init__(self, attr: str, op: str, value: str, negate=False) -> None:
+        if op == "~":
+            raise ValueError(f"Query: `~` not for number `{attr}`")
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError(f"Query: `{value}` is not a number") from None
+        super().__init__(attr, op, number, negate)
+        self.compare = COMPARES[op]
+
+    def test(self, value) -> bool:
+        return self.compare(value, self.value)
+
+    def rows(self, store):
+        column, compare, value, negate = (
+            getattr(store, self.attr),
+            self.compare,
+            self.value,
+            self.negate,
+        )
+        return lambda rows: [
+            row for row in rows if compare(column[row], value) is not negate
+        ]
+
+
+class DateCondition(NumberCondition):
+    """timestamp, 0 is no date (not out of date)"""
+
+    def __init__(self, attr: str, op: str, value: str, negate=False) -> None:
+        if found := _AGE.fullmatch(value):
+            if op not in REVERSES:
+                raise ValueError(f"Query: age `{value}` is compared with < or >")
+            # younger than an age is after a date
+            op = REVERSES[op]
+            value = str(time.time() - int(found[1]) * AGES[found[2]])
+        elif value and not value.isdigit():
+            try:
+                value = str(datetime.strptime(value, "%Y-%m-%d").timestamp())
+            except ValueError:
+                raise ValueError(f"Query: `{value}` is not a date or age") from None
+            if op in (":", "="):
+                op = ">="  # this day or after
+        super().__init__(attr, op, value, negate)
+
+    def test(self, value) -> bool:
+        return bool(value) and self.compare(value, self.value)
+
+    def rows(self, store):
+        column, compare, value, negate = (
+            getattr(store, self.attr),
+            self.compare,
+            self.value,
+            self.negate,
+        )
+        return lambda rows: [
+            row
+            for row in rows
+            if (bool(column[row]) and compare(column[row], value)) is not negate
+        ]
+
+
+class FlagCondition(Condition):
+    """yes/no field: package has a value"""
+
+    VALUES = ("yes", "no", "true", "false")
+
+    def __init__(self, attr: str, op: str, value: str, negate=False) -> None:
+        if op not in (":", "=") or value not in self.VALUES:
+            raise ValueError(f"Query: `{attr}` is yes or no")
+        super().__init__(attr, op, value in ("yes", "true"), negate)
+
+    def test(self, value) -> bool:
+        return bool(value) is self.value
+
+
+class TextCondition(Condition):
+    def __init__(self, attr: str, op: str, value: str, negate=False) -> None:
+        if op not in (":", "=", "~"):
+            raise ValueError(f"Query: `{op}` not for text `{attr}`")
+        super().__init__(attr, op, value.casefold(), negate)
+
+    def test(self, value: str) -> bool:
+        if self.op == "~":
+            return self.value in value.casefold()
+        return self.value == value.casefold()
+
+    def positions(self, index):
+        if self.negate or len(self.value) < 3:
+            return None
+        if self.attr == "name":
+            return index.names.candidates(self.value)
+        # descriptions are indexed by a first search in descriptions, not here
+        if self.attr == "description" and (texts := index.lazy.get("texts")):
+            return texts.candidates(self.value)
+        return None
+
+
+class WordCondition(TextCondition):
+    """word alone, in name or description"""
+
+    def __init__(self, value: str, negate=False) -> None:
+        super().__init__("description", "~", value, negate)
+
+    def match(self, pkg):
+        return self.test(f"{pkg.name} {pkg.description}") is not self.negate
+
+    def rows(self, store):
+        names, descriptions, value, negate = (
+            store.name,
+            store.description,
+            self.value,
+            self.negate,
+        )
+        return lambda rows: [
+            row
+            for row in rows
+            if (value in f"{names[row]} {descriptions[row]}".casefold()) is not negate
+        ]
+
+
+class PooledCondition(TextCondition):
+    """interned text: compare strings of pool once, then only ids"""
+
+    def rows(self, store):
+        strings, test = store.strings.strings, self.test
+        column, negate = getattr(store, self.attr), self.negate
+
+        def select(rows: list[int]) -> list[int]:
+            # only test strings used by these rows
+            ids = {i for i in {column[row] for row in rows} if test(strings[i])}
+            return [row for row in rows if (column[row] in ids) is not negate]
+
+        return select
+
+    def positions(self, index):
+        if self.negate or self.attr != "maintainer" or self.op == "~":
+            return None
+        return set().union(  # caller holds index.lock
+            *(
+                positions
+                for maintainer, positions in index.maintainers.items()
+                if maintainer.casefold() == self.value
+            )
+        )
+
+
+class ListCondition(TextCondition):
+    """a value of list is equal or contains"""
+
+    def __init__(self, attr: str, op: str, value: str, negate=False) -> None:
+        super().__init__(attr, op, value, negate)
+        if self.is_depend():
+            self.value = dep_name(self.value)
+
+    def is_depend(self) -> bool:
+        return self.attr.endswith("depends") and self.op != "~"
+
+    def test(self, values: list[str]) -> bool:
+        if self.is_depend():
+            return any(dep_name(value) == self.value for value in values)
+        return any(super(ListCondition, self).test(value) for value in values)
+
+    def rows(self, store):
+        one = super().test
+        if self.is_depend():
+            one = lambda value: dep_name(value) == self.value
+        strings = store.strings.strings
+        flat = getattr(store, self.attr)
+        offsets = getattr(store, f"{self.attr}_offsets")
+        ends = getattr(store, f"{self.attr}_ends")
+        negate = self.negate
+
+        def select(rows: list[int]) -> list[int]:
+            # only test strings used by these rows
+            if len(rows) > len(store) // 4:
+                used = set(flat)
+            else:
+                used = {i for row in rows for i in flat[offsets[row] : ends[row]]}
+            ids = {i for i in used if one(strings[i])}
+            return [
+                row
+                for row in rows
+                if ids.isdisjoint(flat[offsets[row] : ends[row]]) is negate
+            ]
+
+        return select
+
+    def positions(self, index):
+        if self.negate or self.attr != "depends" or self.op == "~":
+            return None
+        if (depends := index.lazy.get("depends")) is None:
+            return None  # not built by a search with dependencies
+        return set(depends.get(self.value))
+
+
+FIELDS = {  # query field: (package attribute, condition)
+    "name": ("name", TextCondition),
+    "description": ("description", TextCondition),
+    "desc": ("description", TextCondition),
+    "version": ("version", TextCondition),
+    "base": ("package_base", TextCondition),
+    "url": ("url", TextCondition),
+    "maintainer": ("maintainer", PooledCondition),
+    "votes": ("num_votes", NumberCondition),
+    "popularity": ("popularity", NumberCondition),
+    "id": ("id", NumberCondition),
+    "modified": ("last_modified", DateCondition),
+    "submitted": ("first_submitted", DateCondition),
+    "outofdate": ("out_of_date", DateCondition),
+    "installed": ("version_local", FlagCondition),
+    "license": ("license", ListCondition),
+    "keyword": ("keywords", ListCondition),
+    "keywords": ("keywords", ListCondition),
+    "depends": ("depends", ListCondition),
+    "dep": ("depends", ListCondition),
+    "makedepends": ("make_depends", ListCondition),
+    "optdepends": ("opt_depends", ListCondition),
+    "provides": ("provides", ListCondition),
+    "conflicts": ("conflicts", ListCondition),
+}
+
+
+class Filter:
+    """compiled query, all conditions must be true"""
+
+    def __init__(self, conditions: list[Condition]) -> None:
+        self.conditions = conditions
+
+    def __call__(self, pkg: Package) -> bool:
+        return all(condition.match(pkg) for condition in self.conditions)
+
+    def positions(self, index) -> set[int] | None:
+        """positions in SearchIndex of packages can match, None if no index used"""
+        found = None
+        for condition in self.conditions:
+            if (positions := condition.positions(index)) is not None:
+                found = positions if found is None else found & positions
+        return found
+
+    def select(self, packages: list[Package], cancelled=None) -> list[Package] | None:
+        """packages matching, same order; by columns if packages are in PackageStore
+        return None if `cancelled()`"""
+        stores: dict[PackageStore, dict[int, Package]] = {}
+        for pkg in packages:
+            stores.setdefault(pkg._store, {})[pkg._row] = pkg
+        result = []
+        for store, by_rows in stores.items():
+            if type(store) is not PackageStore:  # lazy store: values are not in columns
+                result.extend(pkg for pkg in by_rows.values() if self(pkg))
+                continue
+            rows = list(by_rows)
+            for condition in self.conditions:
+                if cancelled and cancelled():
+                    return None
+                rows = condition.rows(store)(rows)
+            result.extend(by_rows[row] for row in rows)
+        if len(stores) > 1:
+            order = {pkg: i for i, pkg in enumerate(packages)}
+            result.sort(key=order.__getitem__)
+        return result
+
+
+def parse(text: str) -> Filter:
+    """compile a query, ValueError if not valid"""
+    conditions = []
+    for item in shlex.split(text):
+        negate = item.startswith("-")
+        found = _CONDITION.fullmatch(item.lower())
+        if not found:
+            conditions.append(WordCondition(item[1:] if negate else item, negate))
+            continue
+        if found[2] not in FIELDS:  # not a field: `https://...` is a word
+            conditions.append(WordCondition(item[1:] if negate else item, negate))
+            continue
+        attr, condition = FIELDS[found[2]]
+        if condition is DateCondition and found[4] in FlagCondition.VALUES:
+            condition = FlagCondition  # outofdate:yes
+        conditions.append(condition(attr, found[3], found[4], negate))
+    return Filter(conditions)
+
+
+def select(packages: list[Package], text: str, index=None) -> list[Package]:
+    """packages found by a query, `index` is SearchIndex of all `packages`"""
+    query = parse(text)
+    if index is not None and (positions := query.positions(index)) is not None:
+        packages = index.packages_at(positions)
+    return query.select(packages)
@@ -0,0 +1,591 @@
+"""
+indexes for search in packages
+"""
+import heapq
+import math
+import re
+import threading
+import time
+from array import array
+from collections import Counter, OrderedDict
+from typing import Callable, Iterable, NamedTuple
+from .core import Package
+
+
+_CONSTRAINT = re.compile(r"[<>=:]")
+
+
+def dep_name(dep: str) -> str:
+    """dependency without version constraint or description: `Python>=3.9` -> python"""
+    return _CONSTRAINT.split(dep, 1)[0].strip().casefold()
+
+
+FUZZY = 2  # search target: package name with typos
+RANKED = 3  # search target: best packages for words of name, description, keywords
+QUERY = 4  # search target: query language, see query.py
+_WORD_SEPARATORS = re.compile(r"[-_.+\s]+")
+
+
+def words(text: str) -> list[str]:
+    """words of a package name: `vscodium-bin` -> vscodium, bin"""
+    return [word for word in _WORD_SEPARATORS.split(text.casefold()) if word]
+
+
+def max_distance(word: str) -> int:
+    """typos accepted in a word"""
+    if len(word) < 4:
+        return 0
+    return 1 if len(word) < 8 else 2
+
+
+def distance(word: str, other: str) -> int:
+    """levenshtein distance, bit-parallel algorithm of Myers"""
+    size = len(word)
+    if not size:
+        return len(other)
+    peq = {}
+    for i, char in enumerate(word):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    mask = (1 << size) - 1
+    last = 1 << (size - 1)
+    pv, mv, score = mask, 0, size
+    for char in other:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+    return score
+
+
+def fuzzy_distance(query_words: list[str], name: str) -> int | None:
+    """typos for find all query words in name, None if too many"""
+    name_words = words(name)
+    total = 0
+    for word in query_words:
+        best = min((distance(word, other) for other in name_words), default=len(word))
+        if best > max_distance(word):
+            return None
+        total += best
+    return total
+
+
+def fuzzy_rank(text: str) -> Callable[[Package], tuple]:
+    """sort key: less typos first, then most popular"""
+    query_words = words(text)
+
+    def key(pkg: Package) -> tuple:
+        if (typos := fuzzy_distance(query_words, pkg.name)) is None:
+            typos = math.inf  # not found: last
+        return (typos, -pkg.popularity)
+
+    return key
+
+
+class BKTree:
+    """metric tree of words by edit distance, a search compares only few words
+    node is [word, {distance: child node}]"""
+
+    def __init__(self) -> None:
+        self.root = None
+
+    def add(self, word: str):
+        if self.root is None:
+            self.root = [word, {}]
+            return
+        node = self.root
+        while (dist := distance(word, node[0])) != 0:
+            if (child := node[1].get(dist)) is None:
+                node[1][dist] = [word, {}]
+                return
+            node = child
+
+    def find(self, word: str, tolerance: int) -> list[tuple[int, str]]:
+        """(distance, word) of words with distance <= tolerance"""
+        found = []
+        nodes = [self.root] if self.root else []
+        while nodes:
+            other, children = nodes.pop()
+            dist = distance(word, other)
+            if dist <= tolerance:
+                found.append((dist, other))
+            nodes.extend(
+                child
+                for child_dist, child in children.items()
+                if dist - tolerance <= child_dist <= dist + tolerance
+            )
+        return found
+
+
+class TrigramIndex:
+    """inverted index: 3 chars -> positions of packages with this text"""
+
+    SIZE = 3
+
+    def __init__(self, key: Callable[[Package], str]) -> None:
+        self.key = key  # text to index for a package
+        self.postings: dict[str, array] = {}
+
+    def add(self, position: int, pkg: Package):
+        text = self.key(pkg)
+        postings = self.postings
+        for gram in {text[i : i + 3] for i in range(len(text) - 2)}:
+            try:
+                postings[gram].append(position)
+            except KeyError:
+                postings[gram] = array("i", (position,))
+
+    def remove(self, position: int, name: str):
+        pass  # position stays in postings, package is None in SearchIndex
+
+    def candidates(self, query: str) -> set[int] | None:
+        """positions with all trigrams of query, None if query is too short"""
+        if len(query) < self.SIZE:
+            return None
+        grams = {query[i : i + 3] for i in range(len(query) - 2)}
+        lists = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+        if not lists[0]:
+            return set()
+        return set(lists[0]).intersection(*lists[1:])
+
+
+class WordIndex:
+    """words of names -> positions, and BKTree of these words for typos"""
+
+    def __init__(self) -> None:
+        self.positions: dict[str, set[int]] = {}
+        self.tree = BKTree()
+
+    def add(self, position: int, pkg: Package):
+        for word in set(words(pkg.name)):
+            try:
+                self.positions[word].add(position)
+            except KeyError:
+                self.positions[word] = {position}
+                self.tree.add(word)
+
+    def remove(self, position: int, name: str):
+        for word in words(name):  # word stays in tree, without package
+            self.positions.get(word, set()).discard(position)
+
+    def find(self, text: str) -> set[int]:
+        """positions of packages with all words of text, with some typos"""
+        positions = None
+        for word in words(text):
+            found = self.tree.find(word, max_distance(word))
+            news = set().union(*(self.positions.get(other, ()) for _, other in found))
+            positions = news if positions is None else positions & news
+        return positions or set()
+
+
+class DependIndex:
+    """dependency name -> positions"""
+
+    def __init__(self) -> None:
+        self.postings: dict[str, array] = {}
+
+    def add(self, position: int, pkg: Package):
+        postings = self.postings
+        for name in {dep_name(dep) for dep in pkg.depends}:
+            try:
+                postings[name].append(position)
+            except KeyError:
+                postings[name] = array("i", (position,))
+
+    def remove(self, position: int, name: str):
+        pass  # position stays in postings, package is None in SearchIndex
+
+    def get(self, name: str) -> Iterable[int]:
+        return self.postings.get(name, ())
+
+
+_TERM = re.compile(r"\w+")
+
+
+def terms(text: str) -> list[str]:
+    return _TERM.findall(text.casefold())
+
+
+class TermIndex:
+    """words of name, description and keywords, for rank packages with BM25
+    a removed package stays in postings (length 0), until SearchIndex.compact()"""
+
+    K1 = 1.2
+    B = 0.75
+    BOOST = 0.1  # weight of log(popularity or votes)
+
+    def __init__(self) -> None:
+        self.postings: dict[str, tuple[array, array]] = {}  # term -> positions, counts
+        self.lengths = array("i")  # terms by position, 0 if removed
+        self.count = 0  # packages
+        self.total = 0  # terms of all packages
+
+    def add(self, position: int, pkg: Package):
+        found = terms(f"{pkg.name} {pkg.description} {' '.join(pkg.keywords)}")
+        if (holes := position - len(self.lengths)) > 0:  # removed before build
+            self.lengths.extend([0] * holes)
+        self.lengths.append(len(found))
+        self.count += 1
+        self.total += len(found)
+        postings = self.postings
+        for term, count in Counter(found).items():
+            try:
+                positions, counts = postings[term]
+                positions.append(position)
+                counts.append(count)
+            except KeyError:
+                postings[term] = (array("i", (position,)), array("i", (count,)))
+
+    def remove(self, position: int, name: str = ""):
+        self.count -= 1
+        self.total -= self.lengths[position]
+        self.lengths[position] = 0
+
+    def top(
+        self,
+        query_terms: list[str],
+        size: int,
+        allowed: set[int] | None = None,
+        boost: Callable[[int], float] | None = None,
+        end: int | None = None,
+    ) -> list[int]:
+        """positions of the `size` best packages, `boost(position)` is a bonus
+        as popularity, only positions in `allowed` if set and before `end`"""
+        if not self.count:
+            return []
+        k1, b = self.K1, self.B
+        average = self.total / self.count
+        lengths = self.lengths
+        if end is None:
+            end = len(lengths)
+        scores: dict[int, float] = {}
+        for term in set(query_terms):
+            if term not in self.postings:
+                continue
+            positions, counts = self.postings[term]
+            # document frequency: only packages not removed
+            found = [
+                (position, count, length)
+                for position, count in zip(positions, counts)
+                if (length := lengths[position])
+            ]
+            freq = len(found)
+            idf = math.log(1 + (self.count - freq + 0.5) / (freq + 0.5))
+            for position, count, length in found:
+                if position >= end:
+                    continue
+                if allowed is not None and position not in allowed:
+                    continue
+                scores[position] = scores.get(position, 0.0) + idf * count * (
+                    k1 + 1
+                ) / (count + k1 * (1 - b + b * length / average))
+        if boost:
+            weight = self.BOOST
+            scores = {
+                position: score * (1 + weight * math.log1p(boost(position)))
+                for position, score in scores.items()
+            }
+        return heapq.nlargest(size, scores, key=scores.__getitem__)
+
+
+class SearchIndex:
+    """indexes of a list of packages, a package is used by its position
+    positions are not reused: a removed package leaves a hole, until compact()
+    loader indexes only names and maintainers, others are built by first search
+    not `full` (lazy mode): only values loaded are indexed, names and maintainers
+    texts are casefolded, as Query.text"""
+
+    RANK_SIZE = 200  # packages found by a ranked search
+    HOLES_MIN = 1000  # compact if more holes and more than 1/4 of positions
+    LAZY = {  # built by require(), in search thread
+        "words": WordIndex,  # FUZZY
+        "texts": lambda: TrigramIndex(
+            lambda pkg: f"{pkg.name} {pkg.description}".casefold()
+        ),
+        "terms": TermIndex,  # RANKED
+        "depends": DependIndex,
+    }
+
+    def __init__(self, full: bool = True) -> None:
+        self.full = full
+        self.boost = "popularity"  # or "num_votes" or None for ranked search
+        # loader thread adds packages, search thread reads indexes
+        self.lock = threading.RLock()
+        self.build_lock = threading.Lock()  # one require() builds an index
+        self.lazy: dict[str, WordIndex | TrigramIndex | TermIndex | DependIndex] = {}
+        self.generation = 0  # changed by compact: positions are not the same
+        self._reset()
+
+    def _reset(self):
+        """empty indexes, lazy indexes already built are kept empty"""
+        self.holes = 0  # positions of removed packages
+        self.packages: list[Package | None] = []
+        self.positions: dict[Package, int] = {}
+        self.size = 0  # positions visible by search
+        self.names = TrigramIndex(lambda pkg: pkg.name.casefold())
+        self.maintainers: dict[str, set[int]] = {}  # maintainer -> positions
+        # by position, name and maintainer when indexed: package can be updated
+        # before remove()
+        self.indexed: list[tuple[str, str]] = []
+        self.lazy = {kind: self.LAZY[kind]() for kind in self.lazy}
+        self.generation += 1
+
+    def add(self, packages: Iterable[Package], publish=True):
+        """index new packages, if not `publish` call publish() when in model"""
+        with self.lock:
+            lazies = list(self.lazy.values())
+            for pkg in packages:
+                position = len(self.packages)
+                self.packages.append(pkg)
+                self.positions[pkg] = position
+                self.indexed.append((pkg.name, pkg.maintainer))
+                try:
+                    self.maintainers[pkg.maintainer].add(position)
+                except KeyError:
+                    self.maintainers[pkg.maintainer] = {position}
+                self.names.add(position, pkg)
+                for index in lazies:
+                    index.add(position, pkg)
+            if publish:
+                self.size = len(self.packages)
+
+    def require(self, kind: str):
+        """lazy index `kind`, built at first call
+        packages are indexed without lock: loader and gui are not blocked,
+        packages added or removed while building are applied after"""
+        if (index := self.lazy.get(kind)) is not None:
+            return index
+        with self.build_lock:
+            while (index := self.lazy.get(kind)) is None:
+                start_time = time.time()
+                with self.lock:
+                    generation = self.generation
+                    packages = list(self.packages)
+                index = self.LAZY[kind]()
+                for position, pkg in enumerate(packages):
+                    if pkg is not None:
+                        index.add(position, pkg)
+                with self.lock:
+                    if generation != self.generation:
+                        continue  # compacted while building
+                    for position, pkg in enumerate(packages):
+                        if pkg is not None and self.packages[position] is None:
+                            index.remove(position, self.indexed[position][0])
+                    for position in range(len(packages), len(self.packages)):
+                        if (pkg := self.packages[position]) is not None:
+                            index.add(position, pkg)
+                    self.lazy[kind] = index
+                print(
+                    f"{kind} index duration: -- {(time.time() - start_time)} seconds --"
+                )
+        return index
+
+    def publish(self, count: int):
+        """`count` packages added by a background load are now in model"""
+        with self.lock:
+            self.size = min(self.size + count, len(self.packages))
+
+    def remove(self, packages: Iterable[Package]):
+        with self.lock:
+            lazies = list(self.lazy.values())
+            for pkg in packages:
+                if (position := self.positions.pop(pkg, None)) is not None:
+                    self.packages[position] = None
+                    name, maintainer = self.indexed[position]
+                    self.maintainers[maintainer].discard(position)
+                    if not self.maintainers[maintainer]:
+                        del self.maintainers[maintainer]
+                    for index in lazies:
+                        index.remove(position, name)
+                    self.holes += 1
+            if self.holes > self.HOLES_MIN and self.holes * 4 > len(self.packages):
+                self.compact()
+
+    def compact(self):
+        """index again packages not removed: postings have no more holes"""
+        with self.lock:
+            start_time = time.time()
+            size = self.size
+            packages = [pkg for pkg in self.packages if pkg is not None]
+            published = sum(1 for pkg in self.packages[:size] if pkg is not None)
+            self._reset()
+            self.add(packages, publish=False)
+            self.size = published
+            print(f"compact index duration: -- {(time.time() - start_time)} seconds --")
+
+    def update(self, packages: Iterable[Package]):
+        """packages with new values"""
+        with self.lock:
+            packages = list(packages)
+            self.remove(packages)
+            self.add(packages)
+
+    def by_maintainer(self, maintainer: str) -> list[Package]:
+        with self.lock:
+            size = self.size
+            return [
+                self.packages[position]
+                for position in sorted(self.maintainers.get(maintainer, ()))
+                if position < size
+            ]
+
+    def maintainer_count(self, maintainer: str) -> int:
+        return len(self.by_maintainer(maintainer))
+
+    def maintainer_counts(self) -> dict[str, int]:
+        """count of packages by maintainer"""
+        with self.lock:
+            size = self.size
+            counts = {
+                maintainer: sum(1 for position in positions if position < size)
+                for maintainer, positions in self.maintainers.items()
+            }
+        return {maintainer: count for maintainer, count in counts.items() if count}
+
+    def fuzzy(self, text: str) -> set[int]:
+        """positions of packages with all words of text, with some typos"""
+        self.require("words")
+        with self.lock:
+            return self.lazy["words"].find(text)
+
+    def ranked(self, text: str, size: int, allowed: set[int] | None = None):
+        """best packages for text, BM25 boosted by `self.boost`"""
+        self.require("terms")
+        with self.lock:
+            boost = None
+            if attr := self.boost:
+                packages = self.packages
+                boost = lambda position: getattr(packages[position], attr) or 0
+            return [  # allowed None: all packages
+                self.packages[position]
+                for position in self.lazy["terms"].top(
+                    terms(text), size, allowed, boost, end=self.size
+                )
+            ]
+
+    def candidates(self, query: "Query") -> list[Package] | None:
+        """packages may contain text and have wanted dependencies and not
+        excluded dependencies, None if index not usable: caller must scan all
+        RANKED: only best packages, in order"""
+        if not self.full and (
+            query.target not in (0, FUZZY) or query.wants or query.nones
+        ):
+            return None  # descriptions and dependencies are not indexed
+        ranked = query.target == RANKED and terms(query.text)
+        fuzzy = query.target == FUZZY and words(query.text)
+        text = query.target == 1 and len(query.text) >= TrigramIndex.SIZE
+        if query.wants or query.nones:
+            self.require("depends")
+        if fuzzy:
+            self.require("words")
+        if text:
+            self.require("texts")
+        if ranked:
+            self.require("terms")
+        with self.lock:
+            positions = None
+            if fuzzy:  # else only dependencies are filtered
+                positions = self.lazy["words"].find(query.text)
+            elif query.target == 0 and len(query.text) >= TrigramIndex.SIZE:
+                positions = self.names.candidates(query.text)
+            elif text:
+                positions = self.lazy["texts"].candidates(query.text)
+            for name in query.wants:
+                found = self.lazy["depends"].get(name)
+                if positions is None:
+                    positions = set(found)
+                else:
+                    positions.intersection_update(found)
+            if query.nones:
+                if positions is None:
+                    positions = set(range(self.size))
+                for name in query.nones:
+                    positions.difference_update(self.lazy["depends"].get(name))
+            if ranked:
+                return self.ranked(query.text, self.RANK_SIZE, positions)
+            if positions is None:
+                return None
+            return self.packages_at(positions)
+
+    def packages_at(self, positions: Iterable[int]) -> list[Package]:
+        """packages in model, by position order"""
+        with self.lock:
+            packages = self.packages
+            size = self.size
+            return [
+                pkg
+                for position in sorted(positions)
+                if position < size and (pkg := packages[position]) is not None
+            ]
+
+
+class Query(NamedTuple):
+    """a filter, `text` is casefolded, dependencies are `dep_name()`"""
+
+    text: str
+    wants: frozenset[str]
+    nones: frozenset[str]
+    target: int
+
+    def ranked(self) -> bool:
+        """result is in order of relevance, not in order of a column"""
+        return self.target in (FUZZY, RANKED) and bool(self.text)
+
+    def narrows(self, other: "Query") -> bool:
+        """all packages found by self are in result of other"""
+        if self.target in (RANKED, QUERY):
+            return False  # only best packages are in result, or not a text
+        if self.target == FUZZY and self.text != other.text:
+            return False
+        return (
+            self.target == other.target
+            and other.text in self.text
+            and self.wants >= other.wants
+            and self.nones >= other.nones
+        )
+
+
+class QueryCache:
+    """results of last queries, valid only for one list of packages
+    used by search thread and gui thread"""
+
+    SIZE = 16
+
+    def __init__(self) -> None:
+        self.results: OrderedDict[Query, list[Package]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, query: Query) -> list[Package] | None:
+        with self.lock:
+            if (result := self.results.get(query)) is not None:
+                self.results.move_to_end(query)
+            return result
+
+    def base(self, query: Query) -> list[Package] | None:
+        """smallest result that contains all packages of query"""
+        with self.lock:
+            results = [
+                result
+                for cached, result in self.results.items()
+                if query.narrows(cached)
+            ]
+        return min(results, key=len) if results else None
+
+    def put(self, query: Query, result: list[Package]):
+        with self.lock:
+            self.results[query] = result
+            self.results.move_to_end(query)
+            if len(self.results) > self.SIZE:
+                self.results.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
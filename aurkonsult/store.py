@@ -0,0 +1,335 @@
+"""
+packages by columns: typed arrays, interned strings and flat lists
+"""
+from array import array
+from itertools import compress
+from operator import ne
+from typing import Any, Callable
+
+INTEGERS = {
+    "id": "q",
+    "out_of_date": "q",  # 0 if not flagged
+    "first_submitted": "q",
+    "last_modified": "q",
+    "num_votes": "q",
+    "vercmp": "b",
+}
+FLOATS = {"popularity": "d"}
+TEXTS = ("name", "version", "package_base", "description", "url")  # one by package
+POOLED = ("maintainer", "version_local")  # same values in many packages
+LISTS = (
+    "license",
+    "keywords",
+    "depends",
+    "make_depends",
+    "opt_depends",
+    "conflicts",
+    "provides",
+)
+
+
+class StringPool:
+    """interned strings, a string is saved once and used by its index"""
+
+    __slots__ = ("strings", "_ids")
+
+    def __init__(self, strings: list[str] | None = None) -> None:
+        self.strings: list[str] = strings or [""]  # index 0 is always ""
+        self._ids = {value: i for i, value in enumerate(self.strings)}
+
+    def add(self, value: str) -> int:
+        try:
+            return self._ids[value]
+        except KeyError:
+            self._ids[value] = index = len(self.strings)
+            self.strings.append(value)
+            return index
+
+    def get(self, value: str) -> int:
+        """index of string, -1 if not in pool"""
+        return self._ids.get(value, -1)
+
+    def __getitem__(self, index: int) -> str:
+        return self.strings[index]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def __getstate__(self):
+        return self.strings
+
+    def __setstate__(self, strings):
+        self.__init__(strings)
+
+
+class PackageStore:
+    """all packages values, one column by field, row is package index"""
+
+    def __init__(self) -> None:
+        self.size = 0
+        self.strings = StringPool()  # for POOLED and LISTS
+        for attr, code in (INTEGERS | FLOATS).items():
+            setattr(self, attr, array(code))
+        for attr in TEXTS:
+            setattr(self, attr, [])
+        for attr in POOLED:
+            setattr(self, attr, array("l"))
+        for attr in LISTS:
+            # values of row are in `attr` from offsets[row] to ends[row]
+            # last offset is start of next row: always len(attr)
+            setattr(self, attr, array("l"))
+            setattr(self, f"{attr}_offsets", array("l", (0,)))
+            setattr(self, f"{attr}_ends", array("l"))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def new_row(self) -> int:
+        """add an empty package, return its row"""
+        for attr in INTEGERS:
+            getattr(self, attr).append(0)
+        for attr in FLOATS:
+            getattr(self, attr).append(0.0)
+        for attr in TEXTS:
+            getattr(self, attr).append("")
+        for attr in POOLED:
+            getattr(self, attr).append(0)
+        for attr in LISTS:
+            offsets = getattr(self, f"{attr}_offsets")
+            offsets.append(offsets[-1])
+            getattr(self, f"{attr}_ends").append(offsets[-1])
+        self.size += 1
+        return self.size - 1
+
+    def extend(self, other: "PackageStore"):
+        """append all packages of an other store"""
+        remap = array("l", map(self.strings.add, other.strings.strings)).__getitem__
+        for attr in INTEGERS | FLOATS:
+            getattr(self, attr).extend(getattr(other, attr))
+        for attr in TEXTS:
+            getattr(self, attr).extend(getattr(other, attr))
+        for attr in POOLED:
+            getattr(self, attr).extend(map(remap, getattr(other, attr)))
+        for attr in LISTS:
+            flat = getattr(self, attr)
+            shift = len(flat)
+            flat.extend(map(remap, getattr(other, attr)))
+            getattr(self, f"{attr}_offsets").extend(
+                shift + offset for offset in getattr(other, f"{attr}_offsets")[1:]
+            )
+            getattr(self, f"{attr}_ends").extend(
+                shift + end for end in getattr(other, f"{attr}_ends")
+            )
+        self.size += other.size
+
+    def appender(self, keys: dict[str, str]) -> Callable[[dict], int]:
+        """fast function for add a record, `keys` are field: record key
+        None or missing values are not injected, use for one load only"""
+        add = self.strings.add
+        values = []  # column, record key, default
+        for attr, code in (INTEGERS | FLOATS).items():
+            values.append((getattr(self, attr), keys.get(attr), 0))
+        for attr in TEXTS:
+            values.append((getattr(self, attr), keys.get(attr), ""))
+        pooled = [(getattr(self, attr), keys.get(attr)) for attr in POOLED]
+        lists = [
+            (
+                getattr(self, attr),
+                getattr(self, f"{attr}_offsets"),
+                getattr(self, f"{attr}_ends"),
+                keys.get(attr),
+            )
+            for attr in LISTS
+        ]
+
+        def append(data: dict) -> int:
+            get = data.get
+            for column, key, default in values:
+                column.append(get(key) or default)
+            for column, key in pooled:
+                column.append(add(get(key) or ""))
+            for flat, offsets, ends, key in lists:
+                if items := get(key):
+                    flat.extend(map(add, items))
+                offsets.append(len(flat))
+                ends.append(len(flat))
+            self.size += 1
+            return self.size - 1
+
+        return append
+
+    def set(self, row: int, attr: str, value: Any):
+        if attr in POOLED:
+            getattr(self, attr)[row] = self.strings.add(value or "")
+        elif attr in LISTS:
+            self._set_list(row, attr, value)
+        elif attr in TEXTS:
+            getattr(self, attr)[row] = value or ""
+        else:
+            getattr(self, attr)[row] = value or 0
+
+    def _set_list(self, row: int, attr: str, values: list[str]):
+        """rewrite values of any row: in place if not longer,
+        else append at end of flat list and repoint row"""
+        flat = getattr(self, attr)
+        offsets = getattr(self, f"{attr}_offsets")
+        ends = getattr(self, f"{attr}_ends")
+        ids = array("l", (self.strings.add(value) for value in values or ()))
+        start, end = offsets[row], ends[row]
+        if len(ids) <= end - start:
+            flat[start : start + len(ids)] = ids
+        else:
+            if end != len(flat):  # old values stay unused in flat list
+                start = offsets[row] = len(flat)
+            del flat[start:]
+            flat.extend(ids)
+            offsets[-1] = len(flat)
+        ends[row] = start + len(ids)
+
+    def get_list(self, row: int, attr: str) -> list[str]:
+        offsets = getattr(self, f"{attr}_offsets")
+        ends = getattr(self, f"{attr}_ends")
+        strings = self.strings.strings
+        return [strings[i] for i in getattr(self, attr)[offsets[row] : ends[row]]]
+
+    def changed_rows(
+        self, rows: list[int], other: "PackageStore", other_rows: list[int], skip=()
+    ) -> list[int]:
+        """indexes i where `rows[i]` of self and `other_rows[i]` of other have
+        not same values, columns in `skip` are not compared
+        compared by columns: no Package is created, strings ids by pool"""
+        count = len(rows)
+        changed = set()
+
+        def compare(olds, news):
+            changed.update(compress(range(count), map(ne, olds, news)))
+
+        for attr in (*INTEGERS, *FLOATS, *TEXTS):
+            if attr not in skip:
+                compare(
+                    map(getattr(self, attr).__getitem__, rows),
+                    map(getattr(other, attr).__getitem__, other_rows),
+                )
+        remap = None  # ids of self strings in other pool, -1 if not in other
+        if other.strings is not self.strings:
+            remap = array("l", map(other.strings.get, self.strings.strings))
+        for attr in POOLED:
+            if attr not in skip:
+                olds = map(getattr(self, attr).__getitem__, rows)
+                compare(
+                    map(remap.__getitem__, olds) if remap else olds,
+                    map(getattr(other, attr).__getitem__, other_rows),
+                )
+        for attr in LISTS:
+            if attr in skip:
+                continue
+            flat = getattr(self, attr)
+            if remap:
+                flat = array("l", map(remap.__getitem__, flat))
+            compare(  # values of a row: slice of flat list
+                map(flat.__getitem__, self._slices(attr, rows)),
+                map(getattr(other, attr).__getitem__, other._slices(attr, other_rows)),
+            )
+        return sorted(changed)
+
+    def _slices(self, attr: str, rows: list[int]):
+        """slices of the flat list of attr for rows"""
+        return map(
+            slice,
+            map(getattr(self, f"{attr}_offsets").__getitem__, rows),
+            map(getattr(self, f"{attr}_ends").__getitem__, rows),
+        )
+
+    def reset_local(self):
+        """remove all local versions"""
+        self.version_local = array("l", bytes(self.version_local.itemsize * self.size))
+        self.vercmp = array("b", bytes(self.size))
+
+    @staticmethod
+    def array_names() -> list[str]:
+        """columns saved as typed arrays"""
+        names = [*INTEGERS, *FLOATS, *POOLED, *LISTS]
+        names += [f"{attr}_offsets" for attr in LISTS]
+        return names + [f"{attr}_ends" for attr in LISTS]
+
+    def columns(self) -> dict:
+        """all values as plain types (for marshal or json): no class is saved"""
+        return {
+            "size": self.size,
+            "strings": self.strings.strings,
+            "arrays": {
+                attr: (getattr(self, attr).typecode, getattr(self, attr).tobytes())
+                for attr in self.array_names()
+            },
+            "texts": {attr: getattr(self, attr) for attr in TEXTS},
+        }
+
+    @classmethod
+    def from_columns(cls, datas: dict) -> "PackageStore":
+        """store saved by columns(), ValueError if values are not valid"""
+        store = cls()
+        size = datas["size"]
+        strings = datas["strings"]
+        if type(size) is not int or size < 0 or type(strings) is not list:
+            raise ValueError("Store: bad size or strings")
+        if not strings or strings[0] != "" or set(map(type, strings)) != {str}:
+            raise ValueError("Store: bad strings")
+        for attr in store.array_names():
+            typecode, buffer = datas["arrays"][attr]
+            if typecode != getattr(store, attr).typecode or type(buffer) is not bytes:
+                raise ValueError(f"Store: bad type of `{attr}`")
+            column = array(typecode)
+            column.frombytes(buffer)  # ValueError if not a multiple of item size
+            setattr(store, attr, column)
+        for attr in store.array_names():
+            column = getattr(store, attr)
+            if attr.endswith("_offsets"):
+                flat = getattr(store, attr[: -len("_offsets")])
+                if len(column) != size + 1 or column[0] != 0 or column[-1] != len(flat):
+                    raise ValueError(f"Store: bad `{attr}`")
+            elif attr.endswith("_ends"):
+                flat = getattr(store, attr[: -len("_ends")])
+                if len(column) != size or (column and max(column) > len(flat)):
+                    raise ValueError(f"Store: bad `{attr}`")
+            elif attr in LISTS or attr in POOLED:
+                if column and (min(column) < 0 or max(column) >= len(strings)):
+                    raise ValueError(f"Store: bad string index in `{attr}`")
+                if attr in POOLED and len(column) != size:
+                    raise ValueError(f"Store: bad size of `{attr}`")
+            elif len(column) != size:
+                raise ValueError(f"Store: bad size of `{attr}`")
+        for attr in TEXTS:
+            column = datas["texts"][attr]
+            if type(column) is not list or len(column) != size:
+                raise ValueError(f"Store: bad size of `{attr}`")
+            if set(map(type, column)) - {str}:
+                raise ValueError(f"Store: bad text in `{attr}`")
+            setattr(store, attr, column)
+        store.strings = StringPool(strings)
+        store.size = size
+        return store
+
+    @staticmethod
+    def column_property(attr: str) -> property:
+        """Package attribute, read/write value in store"""
+
+        def setter(pkg, value):
+            pkg._store.set(pkg._row, attr, value)
+
+        if attr in POOLED:
+
+            def getter(pkg):
+                store = pkg._store
+                return store.strings.strings[getattr(store, attr)[pkg._row]]
+
+        elif attr in LISTS:
+
+            def getter(pkg):
+                return pkg._store.get_list(pkg._row, attr)
+
+        else:
+
+            def getter(pkg):
+                return getattr(pkg._store, attr)[pkg._row]
+
+        return property(getter, setter)
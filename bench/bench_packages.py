@@ -0,0 +1,52 @@
+"""
+create packages from json records: old populate by field, populate(), from_records()
+python bench/bench_packages.py [count]
+"""
+import sys
+
+from common import aur_records, report, timed
+
+from aurkonsult.core import FIELDS, Package
+from aurkonsult.store import PackageStore
+
+
+def populate_by_field(pkg: Package, data: dict):
+    """populate() before precomputed AUR_NAMES: key rebuilt, try by field"""
+    for attr in FIELDS:
+        attr_aur = Package.denormalize_name_attr(attr)
+        try:
+            if value := data[attr_aur]:
+                setattr(pkg, attr, value)
+        except Exception:
+            pass
+    pkg.set_version_local(pkg.version_local)
+    if pkg.package_base == pkg.name:
+        pkg.package_base = ""
+
+
+def main(count: int):
+    records = aur_records(count)
+
+    def by_field():
+        store = PackageStore()
+        for data in records:
+            populate_by_field(Package(store=store, row=store.new_row()), data)
+
+    def populate():
+        store = PackageStore()
+        for data in records:
+            Package(data, store=store, row=store.new_row())
+
+    def from_records():
+        Package.from_records([dict(data) for data in records])
+
+    results = {
+        "populate by field (before)": timed(by_field),
+        "populate()": timed(populate),
+        "from_records()": timed(from_records),
+    }
+    report(f"Package constructors, {count} records", results)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 90_000)
@@ -0,0 +1,114 @@
+"""
+paint of the package list without display (QT_QPA_PLATFORM=offscreen)
+model and delegate of the baseline, then status flags and display cache
+python bench/bench_paint.py [count] [frames]
+a frame scrolls 3 rows and paints the visible rows
+"""
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from common import aur_records, report, timed  # noqa: E402
+from PyQt5 import QtCore, QtGui, QtWidgets  # noqa: E402
+
+from aurkonsult.core import Package  # noqa: E402
+from aurkonsult.gui import models  # noqa: E402
+
+
+class modelBefore(models.packageModel):
+    """data() of the baseline: all roles, values formatted for each painted cell"""
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        pkg = index.internalPointer() or self._data[index.row()]
+        match role:
+            case QtCore.Qt.DisplayRole:
+                if index.column() == self.ID_URL:
+                    return f"{pkg:hostname}"
+                if index.column() == self.ID_DATE:
+                    return f"{pkg:LastModified}"
+                return self.pkgVal(pkg, index.column())
+            case QtCore.Qt.ToolTipRole:
+                return f"{pkg.name} {pkg.version}"
+            case self.urlRole:
+                return pkg.url
+            case self.nameRole:
+                return pkg.name
+        return None
+
+
+class delegateBefore(models.listDelegate):
+    """initStyleOption of the baseline: package values read by cell"""
+
+    def initStyleOption(self, option, index):
+        if not index.isValid():
+            return None
+        QtWidgets.QStyledItemDelegate.initStyleOption(self, option, index)
+        pkg = index.internalPointer()
+        if index.data(QtCore.Qt.DisplayRole):
+            if self.hfont < 0:
+                self.hfont = option.font.pointSize()
+            option.font.setPointSize(self.hfont)
+            if index.column() == models.packageModel.ID_NAME and pkg.is_installed():
+                option.palette.setBrush(
+                    QtGui.QPalette.Text, QtGui.QPalette().highlight()
+                )
+            if index.column() == models.packageModel.ID_VERSION:
+                if -pkg:
+                    option.palette.setBrush(QtGui.QPalette.Text, self.OUTOFDATE)
+                    option.font.setBold(True)
+                return
+            if index.column() == models.packageModel.ID_DATE:
+                if pkg.first_submitted > self.time_since_update:
+                    option.palette.setBrush(
+                        QtGui.QPalette.Text, QtGui.QPalette().highlight()
+                    )
+
+
+def main(count: int, frames: int):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    packages = Package.from_records(aur_records(count))
+    view = QtWidgets.QTreeView()
+    view.setUniformRowHeights(True)
+    view.resize(1000, 800)
+    view.show()
+    since = 1300000000 + count * 900  # last 10% are new
+    scrollbar = view.verticalScrollBar()
+
+    def scroll(model_class, delegate_class, cache=True):
+        model = model_class(None)
+        model.time_since_update = since  # for flag NEW, before status of rows
+        model.inject(packages)
+        view.setModel(model)
+        view.setItemDelegate(delegate_class(view, since))
+        app.processEvents()
+
+        def paint():  # scroll by 3 rows, as mouse wheel
+            for frame in range(frames):
+                if not cache:
+                    model.display.clear()
+                scrollbar.setValue(frame * 3)
+                view.viewport().grab()
+
+        return paint
+
+    results = {
+        "baseline model and delegate": timed(scroll(modelBefore, delegateBefore)),
+        "status flags": timed(
+            scroll(models.packageModel, models.listDelegate, False)
+        ),
+        "status flags + display cache": timed(
+            scroll(models.packageModel, models.listDelegate)
+        ),
+    }
+    report(f"paint, {count} packages, {frames} frames", results)
+    del app
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 90_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+    )
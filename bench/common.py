@@ -0,0 +1,61 @@
+"""
+helpers for benchmarks: synthetic aur records, timer, results in bench_output.txt
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+OUTPUT = ROOT / "bench_output.txt"
+COUNT = 90_000  # packages in aur
+
+
+def aur_records(count: int = COUNT, seed: int = 1) -> list[dict]:
+    """records as in packages-meta-ext-v1.json, same values for a seed"""
+    rand = random.Random(seed)
+    libs = [f"lib{i}" for i in range(400)]
+    records = []
+    for i in range(count):
+        name = f"pkg{i}-{rand.choice(('git', 'bin', 'qt', 'python'))}"
+        records.append(
+            {
+                "ID": i + 1,
+                "Name": name,
+                "PackageBase": name if i % 3 else f"base{i}",
+                "Version": f"{rand.randint(0, 20)}.{rand.randint(0, 99)}-1",
+                "Description": f"package {i} for " + " ".join(rand.sample(libs, 6)),
+                "URL": f"https://example.org/{name}",
+                "NumVotes": rand.randint(0, 500),
+                "Popularity": rand.random() * 10,
+                "OutOfDate": rand.choice((None, None, None, 1600000000)),
+                "Maintainer": rand.choice((None, *(f"user{j}" for j in range(900)))),
+                "FirstSubmitted": 1300000000 + i * 1000,
+                "LastModified": 1600000000 + rand.randint(0, 10**8),
+                "Depends": rand.sample(libs, rand.randint(0, 8)),
+                "MakeDepends": rand.sample(libs, rand.randint(0, 3)),
+                "License": ["GPL"],
+                "Keywords": rand.sample(libs, rand.randint(0, 3)),
+            }
+        )
+    return records
+
+
+def timed(function, repeat: int = 3) -> float:
+    """best duration of `repeat` runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(title: str, results: dict[str, float]):
+    """print results and add them at end of bench_output.txt"""
+    lines = [f"== {title} -- {time.strftime('%Y-%m-%d %H:%M')} =="]
+    lines += [f"{name:<40} {value:10.4f} s" for name, value in results.items()]
+    print("\n".join(lines))
+    with OUTPUT.open("a") as fout:
+        fout.write("\n".join(lines) + "\n\n")
@@ -0,0 +1,44 @@
+"""
+tests without network, pacman or display; results are saved in test_output.txt
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def pytest_terminal_summary(terminalreporter):
+    lines = [
+        f"{status}: {report.nodeid}"
+        for status in ("passed", "failed", "error", "skipped")
+        for report in terminalreporter.stats.get(status, ())
+    ]
+    (ROOT / "test_output.txt").write_text("\n".join(lines) + "\n")
+
+
+@pytest.fixture(scope="session")
+def app():
+    """one QApplication for gui tests, QT_QPA_PLATFORM is set by the test module"""
+    QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def record(i: int, **values) -> dict:
+    """aur json record of package `i`, `values` replace fields"""
+    return {
+        "ID": i + 1,  # 0 is not an aur ID
+        "Name": f"pkg{i:03}",
+        "Version": "1.0-1",
+        "Description": f"package {i}",
+        "Maintainer": f"user{i % 7}",
+        "NumVotes": i % 20,
+        "Popularity": i / 3,
+        "LastModified": 1000 + i,
+        "FirstSubmitted": 100 + i,
+        "Depends": ["glibc", f"lib{i % 5}"],
+        "License": ["MIT"],
+        **values,
+    }
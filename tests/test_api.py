@@ -0,0 +1,128 @@
+"""
+download with a local http.server as aur
+"""
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from aurkonsult import api
+
+PACKAGES = [
+    {"ID": 1, "Name": "foo", "Version": "1.0-1", "Description": "foo package"},
+    {"ID": 2, "Name": "bar-git", "Version": "r10.abc-1", "Description": "bar"},
+]
+DATABASES = ("packages-meta-v1", "packages-meta-ext-v1")
+
+
+def aur_json(packages: list[dict]) -> bytes:
+    """same format as aur: one package by line"""
+    lines = ",\n".join(json.dumps(pkg) for pkg in packages)
+    return f"[\n{lines}\n]\n".encode()
+
+
+class AurHandler(BaseHTTPRequestHandler):
+    """serve `server.files`: path -> (etag, gzip body), count requests"""
+
+    def do_HEAD(self):
+        self.server.requests.append(("HEAD", self.path, dict(self.headers)))
+        self.send_response(405)
+        self.end_headers()
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path, dict(self.headers)))
+        if self.path not in self.server.files:
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag, body = self.server.files[self.path]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", "Mon, 01 Jan 2024 10:00:00 GMT")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def aur():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AurHandler)
+    server.requests = []
+    server.files = {
+        f"/{name}.json.gz": (f'"{name}-1"', gzip.compress(aur_json(PACKAGES)))
+        for name in DATABASES
+    }
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def download(aur, tmp_path, name: str, progress=None) -> int:
+    return api.download(
+        tmp_path / f"{name}.json",
+        f"{aur.url}/{name}.json.gz",
+        tmp_path / f"{name}.time",
+        tmp_path / f"{name}.meta",
+        progress,
+    )
+
+
+@pytest.mark.parametrize("name", DATABASES)
+def test_download_then_not_modified(aur, tmp_path, name):
+    progress = []
+    assert download(aur, tmp_path, name, lambda *args: progress.append(args)) == 200
+    db_file = tmp_path / f"{name}.json"
+    assert db_file.read_bytes() == aur_json(PACKAGES)
+    assert json.loads((tmp_path / f"{name}.meta").read_text())["ETag"] == f'"{name}-1"'
+    assert (tmp_path / f"{name}.time").exists()
+    assert progress and progress[-1][0] == progress[-1][1]  # all bytes read
+
+    mtime = db_file.stat().st_mtime_ns
+    assert download(aur, tmp_path, name) == 304
+    assert db_file.stat().st_mtime_ns == mtime
+    # one conditional GET by download, never a HEAD
+    assert [method for method, *_ in aur.requests] == ["GET", "GET"]
+    assert aur.requests[1][2]["If-None-Match"] == f'"{name}-1"'
+    assert "If-Modified-Since" in aur.requests[1][2]
+
+
+def test_download_modified(aur, tmp_path):
+    name = DATABASES[0]
+    assert download(aur, tmp_path, name) == 200
+    packages = PACKAGES + [{"ID": 3, "Name": "new", "Version": "1-1"}]
+    aur.files[f"/{name}.json.gz"] = ('"new"', gzip.compress(aur_json(packages)))
+    assert download(aur, tmp_path, name) == 200
+    assert (tmp_path / f"{name}.json").read_bytes() == aur_json(packages)
+    assert json.loads((tmp_path / f"{name}.meta").read_text())["ETag"] == '"new"'
+
+
+@pytest.mark.parametrize(
+    "body",
+    (b"not gzip at all", gzip.compress(b"x" * 4096)[:-20] + b"\0" * 20),
+    ids=("not-gzip", "zlib-error"),
+)
+def test_download_corrupt_keeps_cache(aur, tmp_path, body):
+    name = DATABASES[0]
+    assert download(aur, tmp_path, name) == 200
+    aur.files[f"/{name}.json.gz"] = ('"bad"', body)
+    assert download(aur, tmp_path, name) == 404
+    assert (tmp_path / f"{name}.json").read_bytes() == aur_json(PACKAGES)
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_download_not_found(aur, tmp_path):
+    assert download(aur, tmp_path, "unknown") == 404
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,213 @@
+"""
+json database, snapshot
+"""
+import json
+import marshal
+import os
+import pickle
+from pathlib import Path
+
+import pytest
+
+from aurkonsult import core, database
+from aurkonsult.config import Configuration
+from aurkonsult.search import RANKED, Query, SearchIndex
+
+
+def write_db(file_name: Path, count: int) -> Path:
+    lines = ",\n".join(
+        json.dumps(
+            {
+                "ID": i + 1,
+                "Name": f"pkg{i}",
+                "Version": "1.0-1",
+                "Description": f"package {i}",
+                "Maintainer": f"user{i % 7}",
+                "LastModified": 1000 + i,
+                "Popularity": i / 3,
+                "Depends": ["glibc", f"lib{i % 5}>=1"],
+                "License": ["MIT"],
+            }
+        )
+        for i in range(count)
+    )
+    file_name.write_text(f"[\n{lines}\n]\n")
+    return file_name
+
+
+@pytest.fixture
+def db_file(tmp_path) -> Path:
+    return write_db(tmp_path / "packages-meta-v1.json", 500)
+
+
+def test_snapshot_round_trip(tmp_path, db_file):
+    snapshot = tmp_path / "cache/db.snapshot"
+    packages = database.load_packages(db_file, snapshot, {}, jobs=1)
+    assert snapshot.stat().st_mode & 0o777 == 0o600
+    loaded = database.read_snapshot(db_file, snapshot, {})
+    assert [p.aur_values() for p in loaded] == [p.aur_values() for p in packages]
+    assert loaded[3].depends == ["glibc", "lib3>=1"]
+
+
+def test_snapshot_outdated(tmp_path, db_file):
+    snapshot = tmp_path / "db.snapshot"
+    database.load_packages(db_file, snapshot, {}, jobs=1)
+    write_db(db_file, 501)
+    assert database.read_snapshot(db_file, snapshot, {}) is None
+
+
+def test_snapshot_writable_by_others(tmp_path, db_file):
+    snapshot = tmp_path / "db.snapshot"
+    database.load_packages(db_file, snapshot, {}, jobs=1)
+    snapshot.chmod(0o666)
+    assert database.read_snapshot(db_file, snapshot, {}) is None
+
+
+@pytest.mark.skipif(os.getuid() != 0, reason="chown needs root")
+def test_snapshot_of_other_user(tmp_path, db_file):
+    snapshot = tmp_path / "db.snapshot"
+    database.load_packages(db_file, snapshot, {}, jobs=1)
+    os.chown(snapshot, 4321, 4321)
+    assert database.read_snapshot(db_file, snapshot, {}) is None
+
+
+class Payload:
+    """pickle runs `Path.touch` on load"""
+
+    def __init__(self, marker: Path) -> None:
+        self.marker = marker
+
+    def __reduce__(self):
+        return (Path.touch, (self.marker,))
+
+
+@pytest.mark.parametrize("content", ("pickle", "garbage", "bad-store"))
+def test_snapshot_not_valid(tmp_path, db_file, content):
+    snapshot = tmp_path / "db.snapshot"
+    marker = tmp_path / "marker"
+    match content:
+        case "pickle":
+            snapshot.write_bytes(pickle.dumps({"version": 3, "x": Payload(marker)}))
+        case "garbage":
+            snapshot.write_bytes(b"\0not a snapshot")
+        case "bad-store":
+            database.load_packages(db_file, snapshot, {}, jobs=1)
+            datas = marshal.loads(snapshot.read_bytes())
+            datas["store"]["arrays"]["depends"] = ("l", b"\xff" * 64)
+            snapshot.write_bytes(marshal.dumps(datas))
+    assert database.read_snapshot(db_file, snapshot, {}) is None
+    assert not marker.exists()
+
+
+@pytest.mark.parametrize("homecache", (True, False))
+def test_snapshot_in_home(homecache):
+    config = Configuration.__new__(Configuration)
+    config.attributes = {"extended": False, "homecache": homecache}
+    assert config.db_snapshot == Path.home() / ".cache/packages-meta-v1.snapshot"
+
+
+@pytest.mark.parametrize("lazy", (False, True))
+def test_limit(tmp_path, db_file, lazy):
+    packages = database.load_packages(
+        db_file, tmp_path / "db.snapshot", {}, limit=10, lazy=lazy
+    )
+    assert [pkg.name for pkg in packages] == [f"pkg{i}" for i in range(10)]
+
+
+def test_lazy_store(db_file):
+    packages = database.read_index(db_file, {})
+    store = packages[0]._store
+    assert "maintainer" in database.LAZY_FIELDS and not store._records
+    assert packages[8].maintainer == "user1"  # loaded, not read in json
+    assert not store._records
+    assert packages[3].depends == ["glibc", "lib3>=1"]
+    packages[3].depends = ["other"]
+    packages[3].description = "changed"
+    packages[4].maintainer = "user0"
+    assert packages[3].depends == ["other"]
+    assert packages[3].description == "changed"
+    assert packages[4].maintainer == "user0"
+    assert packages[5].description == "package 5"
+
+
+def test_lazy_index(db_file):
+    packages = database.read_index(db_file, {})
+    index = SearchIndex(full=False)
+    index.add(packages)
+    assert not packages[0]._store._records  # only loaded values are indexed
+    found = index.candidates(Query("pkg12", frozenset(), frozenset(), 0))
+    assert [pkg.name for pkg in found][:2] == ["pkg12", "pkg120"]
+    assert len(index.by_maintainer("user3")) == len(range(3, 500, 7))
+    for target in (1, RANKED):  # descriptions are not indexed
+        query = Query("package", frozenset(), frozenset(), target)
+        assert index.candidates(query) is None
+
+
+def test_split_ranges(db_file):
+    ranges = database._split_ranges(db_file, 7)
+    assert ranges[0][0] == 0 and ranges[-1][1] == db_file.stat().st_size
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    parts = [database._parse_range(db_file, *bounds) for bounds in ranges]
+    assert sum(len(part) for part in parts) == 500
+
+
+def test_parallel(tmp_path, monkeypatch):
+    db_file = write_db(tmp_path / "packages-meta-v1.json", 3000)
+    serial = database.PackageStore()
+    packages = [
+        pkg
+        for batch in database.read_json_parallel(db_file, {}, serial, jobs=1)
+        for pkg in batch
+    ]
+    monkeypatch.setattr(database, "PARALLEL_MIN_SIZE", db_file.stat().st_size // 2)
+    store = database.PackageStore()
+    parts = list(database.read_json_parallel(db_file, {}, store, jobs=2))
+    assert len(parts) == 4  # parsed in other processes, by range
+    assert [p.aur_values() for part in parts for p in part] == [
+        p.aur_values() for p in packages
+    ]
+
+
+class BrokenPool:
+    """parse first range in this process, then pool is broken"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def map(self, function, *iterables):
+        yield function(*next(zip(*iterables)))
+        raise database.BrokenProcessPool("killed")
+
+
+def test_parallel_broken(tmp_path, monkeypatch, capsys):
+    db_file = write_db(tmp_path / "packages-meta-v1.json", 3000)
+    monkeypatch.setattr(database, "PARALLEL_MIN_SIZE", 0)
+    monkeypatch.setattr(database, "ProcessPoolExecutor", BrokenPool)
+    store = database.PackageStore()
+    parts = list(database.read_json_parallel(db_file, {}, store, jobs=3))
+    assert len(parts) == 6  # first by pool, others in this process
+    assert [pkg.name for part in parts for pkg in part] == [
+        f"pkg{i}" for i in range(3000)
+    ]
+    assert "continue in one process" in capsys.readouterr().out
+
+
+def test_join_local_not_in_aur():
+    user_aurs = {
+        f"local{i}": (f"local{i}", "1.0-1", f"local {i}", "") for i in range(3)
+    }
+    size = len(core.DETACHED)
+    first = database.join_local({}, user_aurs)
+    joined = database.join_local({}, user_aurs)
+    assert len(core.DETACHED) == size  # not one row more by join
+    assert [pkg.name for pkg in joined.missing] == ["local0", "local1", "local2"]
+    assert joined.missing[1].version_local == "1.0-1"
+    assert joined.missing[1].description == "local 1"
+    assert joined.missing[0]._store is not first.missing[0]._store
+    assert not joined.installed and not joined.outdated
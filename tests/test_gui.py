@@ -0,0 +1,211 @@
+"""
+main window without display (QT_QPA_PLATFORM=offscreen): load, search, views, paint
+database and pacman local database are files in tmp_path
+"""
+import ctypes.util
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+from PyQt5 import QtCore  # noqa: E402
+
+from aurkonsult import database  # noqa: E402
+from aurkonsult.config import Configuration  # noqa: E402
+from aurkonsult.gui import models  # noqa: E402
+from aurkonsult.gui.main import WinMain  # noqa: E402
+from aurkonsult.localdb import LocalDB  # noqa: E402
+from conftest import record  # noqa: E402
+
+COUNT = 300
+# installed version of an aur package is compared by libalpm
+ALPM = ctypes.util.find_library("alpm") is not None
+
+
+def write_db(file_name: Path, datas: list[dict]):
+    lines = ",\n".join(json.dumps(data) for data in datas)
+    file_name.write_text(f"[\n{lines}\n]\n")
+
+
+def write_desc(local: Path, name: str, version: str):
+    directory = local / f"{name}-{version}"
+    directory.mkdir(parents=True)
+    (directory / "desc").write_text(
+        f"%NAME%\n{name}\n\n%VERSION%\n{version}\n\n%VALIDATION%\nnone\n\n"
+    )
+
+
+def wait(app, condition, timeout=20.0):
+    end = time.time() + timeout
+    while not condition():
+        assert time.time() < end, "timeout"
+        app.processEvents(QtCore.QEventLoop.AllEvents, 50)
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    (tmp_path / ".cache").mkdir()
+    (tmp_path / "sync").mkdir()  # no sync database: aur packages have no packager
+    write_desc(tmp_path / "local", "localonly", "2.0-1")  # not in aur
+    config = Configuration.__new__(Configuration)
+    config.attributes = {
+        "extended": True,
+        "comment": False,
+        "history": False,
+        "pamac": False,
+        "homecache": True,
+        "lazy": False,
+        "jobs": 1,
+    }
+    config.local_db = LocalDB(tmp_path / "local", sync=tmp_path / "sync")
+    config.user_aurs = config.load_aur_user()
+    config.time_since_update = 100 + COUNT - 11  # last 10 submitted are new
+    write_db(config.db_file, [record(i) for i in range(COUNT)])
+    return config
+
+
+@pytest.fixture
+def window(app, config):
+    main = WinMain(config)
+    main.show()
+    wait(app, lambda: main.win.proxyModel._origin and not main.win.loading)
+    yield main
+    main.win.cancelSearch()
+    main.threadpool.waitForDone()
+    main.close()
+
+
+def search(app, win, text: str, target: int) -> list[str]:
+    win.filterSyntaxComboBox.setCurrentIndex(target)
+    win.filterPatternLineEdit.setText(text)
+    win.textFilterChanged()
+    wait(app, lambda: win.search_worker is None)
+    return [pkg.name for pkg in win.proxyModel._data]
+
+
+def test_load(app, window):
+    win = window.win
+    assert len(win.proxyModel._origin) == COUNT
+    win.sourceView.sortByColumn(models.packageModel.ID_DATE, QtCore.Qt.AscendingOrder)
+    assert win.proxyModel._data[0].name == f"pkg{COUNT - 1:03}"  # new first
+    assert win.sourceView.viewport().grab().width() > 0
+    assert win.proxyModel.display  # painted cells are cached
+    assert win.config.db_snapshot.exists()
+
+
+def test_locale_change(app, window):
+    win = window.win
+    win.sourceView.viewport().grab()
+    assert win.proxyModel.display._values
+    app.sendEvent(app, QtCore.QEvent(QtCore.QEvent.LocaleChange))
+    assert not win.proxyModel.display._values  # dates are formatted again
+
+
+def test_search(app, window):
+    win = window.win
+    assert search(app, win, "pkg01", 0)[:1] == ["pkg010"]
+    assert set(search(app, win, "package 12", 1)) == {"pkg012"} | {
+        f"pkg{i}" for i in range(120, 130)
+    }
+    assert "pkg123" in search(app, win, "pkk123", 2)
+    assert search(app, win, "package 250", 3)[0] == "pkg250"
+    found = search(app, win, "maintainer:user1 votes>15", 4)
+    assert found and all(name in found for name in ("pkg036", "pkg099"))
+    for name in found:
+        i = int(name[3:])
+        assert i % 7 == 1 and i % 20 > 15
+    search(app, win, "pk", 0)  # too short: last result is kept
+    assert win.proxyModel._data and not win.search_timer.isActive()
+    win.filterDepLineEdit.setText("-lib1")
+    assert "pkg001" not in search(app, win, "", 0)
+    win.sourceView.sortByColumn(0, QtCore.Qt.DescendingOrder)
+    names = [pkg.name for pkg in win.proxyModel._data]
+    assert names == sorted(names)
+    win.sourceView.viewport().grab()
+
+
+def test_complete_and_info(app, window):
+    win = window.win
+    win.onCompleteName("PKG01")
+    assert win.completer_model.rowCount() == 10
+    pkg = win.proxyModel.byName()["pkg008"]
+    win.populate_Info(pkg)
+    maintainer = win.form["MaintainerList"]
+    assert maintainer.count() == len(range(1, COUNT, 7))
+    assert "pkg008" in (maintainer.itemText(i) for i in range(maintainer.count()))
+
+
+def test_views(app, window):
+    win = window.win
+    window.onNew()
+    assert len(win.proxyModel._data) == 10
+    win.sourceView.viewport().grab()
+    window.onCheck()
+    assert win.currentModel is win.checkModel
+    assert [pkg.name for pkg in win.checkModel._data] == ["localonly"]
+    win.sourceView.viewport().grab()
+    window.onList()
+    assert win.currentModel is win.proxyModel
+    assert len(win.proxyModel._data) == COUNT
+
+
+def test_apply_changes(app, window, config):
+    win = window.win
+    search(app, win, "package 1", 1)
+    datas = [record(i) for i in range(COUNT) if i != 10]
+    datas[1] = record(1, Description="other")
+    datas.append(record(COUNT, Description="package 1 new"))
+    write_db(config.db_file, datas)
+    win.applyChanges(
+        database.diff_packages(
+            win.proxyModel._origin,
+            database.load_packages(config.db_file, config.db_snapshot, {}, jobs=1),
+        )
+    )
+    names = [pkg.name for pkg in win.proxyModel._data]
+    assert "pkg010" not in names and "pkg001" not in names
+    assert f"pkg{COUNT}" in names
+    win.filterSyntaxComboBox.setCurrentIndex(0)
+    win.onCompleteName(f"pkg{COUNT}")
+    assert win.completer_model.rowCount() == 1
+
+
+def test_local_changed(app, window, config):
+    win = window.win
+    window.onCheck()
+    for desc in (config.local_db.path / "localonly-2.0-1").iterdir():
+        desc.unlink()
+    win.onLocalChanged()
+    assert not config.user_aurs and not win.checkModel._data
+
+
+@pytest.mark.skipif(not ALPM, reason="libalpm not installed")
+def test_local_installed(app, window, config):
+    win = window.win
+    write_desc(config.local_db.path, "pkg005", "0.9-1")
+    win.onLocalChanged()
+    pkg = win.proxyModel.byName()["pkg005"]
+    assert pkg.version_local == "0.9-1" and pkg.vercmp < 0
+    assert "pkg005" in search(app, win, "installed:yes", 4)
+    window.onCheck()
+    assert {p.name for p in win.checkModel._data} == {"localonly", "pkg005"}
+    win.sourceView.viewport().grab()
+
+
+def test_lazy(app, config):
+    config.attributes["lazy"] = True
+    main = WinMain(config)
+    wait(app, lambda: main.win.proxyModel._origin and not main.win.loading)
+    win = main.win
+    items = win.filterSyntaxComboBox.model()
+    for target in models.packageModel.TEXT_TARGETS:
+        assert not items.item(target).isEnabled()
+    found = search(app, win, "pkg02", 0)
+    assert sorted(found) == [f"pkg02{i}" for i in range(10)]
+    main.threadpool.waitForDone()
+    main.close()
@@ -0,0 +1,184 @@
+"""
+pacman local database: a tree of desc files in tmp_path
+"""
+import gzip
+import io
+import os
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from aurkonsult import localdb
+from aurkonsult.localdb import LocalDB
+
+COUNT = 2000  # more than PARALLEL_MIN: cold read by threads
+
+
+def write_desc(local: Path, name: str, version: str, validation="none") -> Path:
+    directory = local / f"{name}-{version}"
+    directory.mkdir(parents=True, exist_ok=True)
+    desc = directory / "desc"
+    desc.write_text(
+        f"%NAME%\n{name}\n\n%VERSION%\n{version}\n\n%DESC%\n{name} package\n\n"
+        f"%VALIDATION%\n{validation}\n\n%SIZE%\n1024\n\n%DEPENDS%\nglibc\nqt5-base\n\n"
+    )
+    return desc
+
+
+def write_sync(file_name: Path, names: list[str], format=tarfile.GNU_FORMAT):
+    """sync database: a gzip tar with `name-version-rel/desc` members"""
+    with tarfile.open(file_name, "w:gz", format=format) as tar:
+        for name in names:
+            info = tarfile.TarInfo(f"{name}-1.0-1/desc")
+            data = f"%NAME%\n{name}\n\n".encode() + b"x" * 5000  # not read
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+def touch(desc: Path, delta: int):
+    """mtime changed even on file systems with coarse mtimes"""
+    mtime = desc.stat().st_mtime_ns + delta * 1_000_000_000
+    os.utime(desc, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def local(tmp_path) -> Path:
+    for i in range(COUNT):
+        write_desc(tmp_path / "local", f"pkg{i}", "1.0-1", "none" if i % 2 else "pgp")
+    (tmp_path / "local/ALPM_DB_VERSION").write_text("9\n")  # not a package
+    return tmp_path / "local"
+
+
+@pytest.fixture
+def reads(monkeypatch) -> list[Path]:
+    """desc files parsed"""
+    files = []
+    parse_desc = localdb.parse_desc
+
+    def parse(file_name):
+        files.append(file_name)
+        return parse_desc(file_name)
+
+    monkeypatch.setattr(localdb, "parse_desc", parse)
+    return files
+
+
+@pytest.fixture
+def pools(monkeypatch) -> list:
+    """thread pools created by refresh"""
+    created = []
+
+    class Pool(localdb.ThreadPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(localdb, "ThreadPoolExecutor", Pool)
+    return created
+
+
+def test_parse_desc(local):
+    pkg = localdb.parse_desc(local / "pkg1-1.0-1/desc")
+    assert pkg == localdb.LocalPackage(
+        "pkg1", "1.0-1", "pkg1 package", "", "none", 1024, 0, ("glibc", "qt5-base")
+    )
+    assert localdb.parse_desc(local / "unknown/desc") is None
+
+
+def test_refresh_cold(local, tmp_path, reads, pools):
+    db = LocalDB(local, sync=tmp_path / "sync")
+    changed, removed = db.refresh()
+    assert len(changed) == COUNT and not removed
+    assert len(reads) == COUNT and len(pools) == 1
+    assert changed["pkg7"].depends == ("glibc", "qt5-base")
+    # no sync database: packages installed with no packager
+    assert len(db.aur_packages()) == COUNT // 2
+    assert "pkg7" in db.aur_packages() and "pkg8" not in db.aur_packages()
+
+
+def test_refresh_only_changed(local, tmp_path, reads, pools):
+    db = LocalDB(local, sync=tmp_path / "sync")
+    db.refresh()
+    reads.clear()
+    assert db.refresh() == ({}, set())
+    assert not reads
+
+    touch(write_desc(local, "pkg3", "1.0-1", "pgp"), 1)  # rewritten in place
+    touch(local / "pkg4-1.0-1/desc", 1)  # same values
+    for path in (local / "pkg5-1.0-1").iterdir():
+        path.unlink()
+    (local / "pkg5-1.0-1").rmdir()
+    write_desc(local, "pkg6", "2.0-1")  # upgraded: new directory
+    for path in (local / "pkg6-1.0-1").iterdir():
+        path.unlink()
+    (local / "pkg6-1.0-1").rmdir()
+    changed, removed = db.refresh()
+    assert sorted(changed) == ["pkg3", "pkg6"]
+    assert changed["pkg3"].validation == "pgp" and changed["pkg6"].version == "2.0-1"
+    assert removed == {"pkg5"}
+    assert sorted(path.parent.name for path in reads) == [
+        "pkg3-1.0-1",
+        "pkg4-1.0-1",
+        "pkg6-2.0-1",
+    ]
+    assert len(pools) == 1  # less than PARALLEL_MIN files: read in this thread
+
+
+def test_cache(local, tmp_path, reads):
+    cache = tmp_path / "local.cache"
+    db = LocalDB(local, cache, sync=tmp_path / "sync")
+    db.refresh()
+    assert cache.exists()
+    reads.clear()
+
+    db = LocalDB(local, cache, sync=tmp_path / "sync")
+    assert len(db.packages) == COUNT  # before refresh
+    touch(local / "pkg9-1.0-1/desc", 1)
+    changed, removed = db.refresh()
+    assert [path.parent.name for path in reads] == ["pkg9-1.0-1"]
+    assert not changed and not removed
+
+    # cache of another local database is not used
+    other = LocalDB(tmp_path / "other", cache, sync=tmp_path / "sync")
+    assert not other.packages
+    cache.write_bytes(b"not a pickle")
+    assert not LocalDB(local, cache, sync=tmp_path / "sync").packages
+
+
+@pytest.mark.parametrize("format", (tarfile.GNU_FORMAT, tarfile.PAX_FORMAT))
+def test_read_sync_names(tmp_path, format):
+    names = ["pkg1", "lib-foo", "x" * 150]  # long name: in a member before
+    write_sync(tmp_path / "core.db", names, format)
+    assert localdb.read_sync_names(tmp_path / "core.db") == frozenset(names)
+
+
+@pytest.mark.parametrize(
+    "content",
+    (b"not gzip", gzip.compress(b"\xff" * 600), b"(\xb5/\xfd zstd"),
+    ids=("garbage", "bad-header", "zstd"),
+)
+def test_read_sync_names_error(tmp_path, content):
+    (tmp_path / "core.db").write_bytes(content)
+    assert localdb.read_sync_names(tmp_path / "core.db") is None
+
+
+def test_sync_not_readable(local, tmp_path, capsys):
+    sync = tmp_path / "sync"
+    sync.mkdir()
+    write_sync(sync / "core.db", [f"pkg{i}" for i in range(0, COUNT, 3)])
+    (sync / "extra.db").write_bytes(b"not gzip")
+    db = LocalDB(local, sync=sync)
+    db.refresh()
+    aurs = db.aur_packages()
+    assert db.unreadable() == ["extra.db"]
+    assert "extra.db" in capsys.readouterr().out
+    # in core: not foreign; others: extra is not known, packager is checked
+    assert sorted(aurs) == sorted(f"pkg{i}" for i in range(COUNT) if i % 3 and i % 2)
+
+    write_sync(sync / "extra.db", [f"pkg{i}" for i in range(1, 100, 2)])
+    aurs = db.aur_packages()
+    assert not db.unreadable()
+    assert sorted(aurs) == sorted(
+        f"pkg{i}" for i in range(COUNT) if i % 3 and not (i < 100 and i % 2)
+    )
@@ -0,0 +1,154 @@
+"""
+gui models without display (QT_QPA_PLATFORM=offscreen), checked by QAbstractItemModelTester
+"""
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+from PyQt5 import QtCore  # noqa: E402
+from PyQt5.QtTest import QAbstractItemModelTester  # noqa: E402
+
+from aurkonsult.core import Package  # noqa: E402
+from conftest import record  # noqa: E402
+from aurkonsult.database import diff_packages  # noqa: E402
+from aurkonsult.gui import models  # noqa: E402
+from aurkonsult.search import FUZZY, RANKED  # noqa: E402
+
+
+def records(count: int) -> list[dict]:
+    return [record(i) for i in range(count)]
+
+
+def new_model(app, datas: list[dict]):
+    model = models.packageModel(None)
+    tester = QAbstractItemModelTester(
+        model, QAbstractItemModelTester.FailureReportingMode.Fatal
+    )
+    model.inject(Package.from_records(datas))
+    return model, tester
+
+
+def names(model) -> list[str]:
+    return [pkg.name for pkg in model._data]
+
+
+def data_changes(model) -> list[tuple[int, int]]:
+    changes = []
+    model.dataChanged.connect(
+        lambda first, last, *_: changes.append((first.row(), last.row()))
+    )
+    return changes
+
+
+def apply(model, datas: list[dict]):
+    model.applyChanges(diff_packages(model._origin, Package.from_records(datas)))
+
+
+def test_apply_changes_keeps_sort(app):
+    model, _ = new_model(app, records(50))
+    model.sort(2, QtCore.Qt.AscendingOrder)  # last_modified, default: new first
+    datas = records(50)
+    datas[3]["LastModified"] = 5000  # updated: now first
+    datas[7]["LastModified"] = 5001
+    datas.append(record(60, LastModified=1020))  # added, in middle
+    apply(model, datas)
+    keys = [pkg.last_modified for pkg in model._data]
+    assert keys == sorted(keys, reverse=True)
+    assert names(model)[:2] == ["pkg007", "pkg003"]
+    assert names(model).index("pkg060") == names(model).index("pkg020") + 1
+    assert len(model._data) == 51
+
+    model.sort(2, QtCore.Qt.DescendingOrder)
+    datas[10]["LastModified"] = 9000
+    apply(model, datas)
+    assert names(model)[-1] == "pkg010"
+    keys = [pkg.last_modified for pkg in model._data]
+    assert keys == sorted(keys)
+
+
+def test_apply_changes_filter(app):
+    model, _ = new_model(app, records(30))
+    model.filterPkg("package 1", set(), set(), 1)
+    assert names(model) == ["pkg001"] + [f"pkg{i:03}" for i in range(10, 20)]
+    datas = records(30)
+    datas[1]["Description"] = "other"  # not matching now
+    datas[2]["Description"] = "package 100"  # matching now
+    datas.append(record(40, Description="package 1 new"))
+    apply(model, datas)
+    assert "pkg001" not in names(model)
+    assert {"pkg002", "pkg040"} <= set(names(model))
+    assert all("package 1" in pkg.description for pkg in model._data)
+
+
+def test_apply_changes_data_changed_by_runs(app):
+    model, _ = new_model(app, records(100))
+    changes = data_changes(model)
+    datas = records(100)
+    for i in (2, 3, 4, 90):
+        datas[i]["NumVotes"] = 50  # not a sorted column, view not sorted
+    apply(model, datas)
+    assert changes == [(2, 4), (90, 90)]
+    assert names(model) == [f"pkg{i:03}" for i in range(100)]
+
+
+def test_apply_changes_removed(app):
+    model, _ = new_model(app, records(20))
+    model.sort(0, QtCore.Qt.DescendingOrder)  # a to z
+    removed = ("pkg000", "pkg005", "pkg019")
+    datas = [d for d in records(20) if d["Name"] not in removed]
+    apply(model, datas)
+    assert names(model) == [d["Name"] for d in datas]
+    assert len(model._origin) == 17
+
+
+def test_selection_follows_package(app):
+    model, _ = new_model(app, records(20))
+    current = QtCore.QPersistentModelIndex(model.index(3, 1, QtCore.QModelIndex()))
+    model.sort(0, QtCore.Qt.AscendingOrder)  # z to a
+    assert current.row() == 16 and current.column() == 1
+    assert model._data[current.row()].name == "pkg003"
+    model.filterPkg("package 1", set(), set(), 1)
+    assert not current.isValid()  # package not in view
+
+
+@pytest.mark.parametrize("order", (QtCore.Qt.AscendingOrder, QtCore.Qt.DescendingOrder))
+def test_sort_stable(app, order):
+    datas = [record(i, LastModified=1000 + i // 10) for i in range(50)]
+    model, _ = new_model(app, datas)
+    model.sort(2, order)
+    for modified in {pkg.last_modified for pkg in model._data}:
+        equals = [pkg.name for pkg in model._data if pkg.last_modified == modified]
+        assert equals == sorted(equals)  # in load order, also when reversed
+    model.filterPkg("package 1", set(), set(), 1)  # less packages: sorted by ranks
+    equals = [pkg.name for pkg in model._data if pkg.last_modified == 1001]
+    assert equals == [f"pkg{i:03}" for i in range(10, 20)]
+
+
+def test_apply_local(app):
+    model, _ = new_model(app, records(30))
+    for i in (3, 4, 5, 20):
+        model._origin[i].version_local = "1.0-1"  # no vercmp: libalpm not needed
+    model.sort(0, QtCore.Qt.DescendingOrder)  # a to z
+    model.filterPkg("installed:yes", set(), set(), 4)
+    assert names(model) == ["pkg003", "pkg004", "pkg005", "pkg020"]
+    changes = data_changes(model)
+    model.applyLocal({"pkg004": "", "pkg020": ""})  # removed
+    assert names(model) == ["pkg003", "pkg005"]
+    assert not model._origin[4].is_installed()
+
+    model.filterPkg("package 1", set(), set(), 1)
+    model.applyLocal({"pkg012": "", "pkg013": "", "pkg003": ""})
+    assert names(model)[3:5] == ["pkg012", "pkg013"]
+    assert changes == [(3, 4)]  # one run, not moved: not sorted by a local field
+
+
+@pytest.mark.parametrize("target", (FUZZY, RANKED))
+def test_dependencies_only(app, target):
+    datas = [record(i, Depends=[f"lib{i % 3}>=1"]) for i in range(30)]
+    model, _ = new_model(app, datas)
+    model.sort(0, QtCore.Qt.AscendingOrder)  # z to a
+    model.filterPkg("", {"lib1"}, set(), target)
+    assert names(model) == [f"pkg{i:03}" for i in range(28, 0, -3)]
+    assert not model.ranked()  # sort of view is kept
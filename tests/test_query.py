@@ -0,0 +1,154 @@
+"""
+query language
+"""
+import time
+
+import pytest
+
+from aurkonsult import query
+from aurkonsult.core import Package
+
+DAY = 86400
+
+
+@pytest.fixture
+def packages() -> list[Package]:
+    now = int(time.time())
+    return Package.from_records(
+        [
+            {
+                "ID": 1,
+                "Name": "foo",
+                "Description": "see https://example.org/foo",
+                "LastModified": now - 2 * DAY,
+                "NumVotes": 150,
+            },
+            {
+                "ID": 2,
+                "Name": "bar",
+                "Description": "old bar",
+                "LastModified": now - 90 * DAY,
+                "NumVotes": 3,
+            },
+        ]
+    )
+
+
+def names(packages: list[Package], text: str) -> list[str]:
+    return [pkg.name for pkg in query.select(packages, text)]
+
+
+def test_age(packages):
+    assert names(packages, "modified<30d") == ["foo"]
+    assert names(packages, "modified>30d") == ["bar"]
+    for op in (":", "="):
+        with pytest.raises(ValueError, match="compared"):
+            query.parse(f"modified{op}30d")
+
+
+def test_unknown_field_is_word(packages):
+    assert names(packages, "https://example.org/foo") == ["foo"]
+    assert names(packages, "-https://example.org votes>1") == ["bar"]
+
+
+def test_condition_is_abstract():
+    with pytest.raises(TypeError):
+        query.Condition("name", ":", "foo")
+
+
+def record(i: int, now: int) -> dict:
+    return {
+        "ID": i + 1,
+        "Name": f"{'qt' if i % 4 == 0 else 'py'}-pkg{i}",
+        "Version": f"1.{i % 3}-1",
+        "Description": f"package {i} {'Foo' if i % 5 == 0 else 'bar'}",
+        "Maintainer": "Foo" if i % 24 == 0 else ("foo", "bar", "")[i % 3],
+        "NumVotes": i * 10,
+        "Popularity": i / 7,
+        "OutOfDate": now - i * DAY if i % 6 == 0 else 0,
+        "FirstSubmitted": now - (200 + i) * DAY,
+        "LastModified": now - i * DAY,
+        "License": ["MIT", "GPL"][: 1 + i % 2] if i % 5 else [],
+        "Keywords": [f"key{i % 3}"],
+        "Depends": ["glibc", f"lib{i % 4}>=1.{i % 2}", "qt5-base: optional"][
+            : 1 + i % 3
+        ],
+        "MakeDepends": ["cmake"] if i % 2 else [],
+    }
+
+
+@pytest.fixture
+def many() -> list[Package]:
+    now = int(time.time())
+    return Package.from_records([record(i, now) for i in range(40)])
+
+
+HEADLINE = "maintainer:foo votes>100 outofdate:yes modified<30d license:MIT name~qt"
+
+
+def test_parse_headline(many):
+    conditions = query.parse(HEADLINE).conditions
+    assert [(type(c), c.attr, c.op) for c in conditions] == [
+        (query.PooledCondition, "maintainer", ":"),
+        (query.NumberCondition, "num_votes", ">"),
+        (query.FlagCondition, "out_of_date", ":"),
+        (query.DateCondition, "last_modified", ">"),  # younger: after a date
+        (query.ListCondition, "license", ":"),
+        (query.TextCondition, "name", "~"),
+    ]
+    assert conditions[0].value == "foo" and conditions[1].value == 100
+    assert conditions[2].value is True and conditions[4].value == "mit"
+    found = names(many, HEADLINE)
+    assert found == ["qt-pkg12", "qt-pkg24"]  # maintainer is Foo or foo
+
+
+@pytest.mark.parametrize(
+    "text",
+    (
+        "name:py-pkg3",
+        "-name~qt",
+        "description~foo",
+        "-desc:bar",
+        "version=1.2-1",
+        "maintainer:foo",
+        "-maintainer:foo",
+        "maintainer~a",
+        "votes>=200",
+        "-votes<100",
+        "popularity<2",
+        "id:7",
+        "modified<30d",
+        "-modified>20d",
+        "submitted>210d",
+        "outofdate:yes",
+        "-outofdate:no",
+        "installed:no",
+        "license:gpl",
+        "-license:mit",
+        "keyword~y2",
+        "depends:lib1",
+        "depends:lib1>=2",  # version of value is not compared
+        "-dep:qt5-base",
+        "dep~lib2>=1.0",
+        "makedepends:cmake",
+        "package",
+        "-foo",
+        "-maintainer:bar votes>50 -depends:lib3 license:mit",
+    ),
+)
+def test_select_by_columns(many, text):
+    search = query.parse(text)
+    expected = [pkg for pkg in many if search(pkg)]
+    assert search.select(many) == expected
+    few = many[5:12]  # less than a quarter of store: strings of rows are tested
+    assert search.select(few) == [pkg for pkg in few if search(pkg)]
+
+
+def test_select_mixed_stores(many):
+    now = int(time.time())
+    others = Package.from_records([record(i, now) for i in range(40, 60)])
+    packages = [pkg for pair in zip(others, many) for pkg in pair] + many[20:]
+    search = query.parse("-maintainer:bar votes>50")
+    found = search.select(packages)
+    assert found == [pkg for pkg in packages if search(pkg)]  # order of packages
+    assert {pkg._store for pkg in found} == {many[0]._store, others[0]._store}
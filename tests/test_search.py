@@ -0,0 +1,191 @@
+"""
+search index
+"""
+import threading
+from collections import OrderedDict
+
+import pytest
+
+from aurkonsult.core import Package
+from aurkonsult.search import (
+    FUZZY,
+    RANKED,
+    Query,
+    QueryCache,
+    SearchIndex,
+    WordIndex,
+    fuzzy_rank,
+)
+
+
+def packages(count: int, start: int = 0) -> list[Package]:
+    return Package.from_records(
+        {
+            "ID": i + 1,
+            "Name": f"Straße-{i}",
+            "Description": f"tool {i}",
+            "Maintainer": f"user{i % 3}",
+            "Depends": [f"lib{i % 4}"],
+        }
+        for i in range(start, start + count)
+    )
+
+
+def query(text: str, target: int = 0, wants=()) -> Query:
+    return Query(text.casefold(), frozenset(wants), frozenset(), target)
+
+
+def names(found) -> set[str]:
+    return {pkg.name for pkg in found}
+
+
+def test_casefold():
+    index = SearchIndex()
+    index.add(packages(3))
+    assert names(index.candidates(query("STRASSE-1"))) == {"Straße-1"}
+    assert names(index.candidates(query("strasse-2", FUZZY))) == {"Straße-2"}
+
+
+@pytest.mark.parametrize("target", (0, 1, FUZZY, RANKED))
+def test_dependencies_only(target):
+    index = SearchIndex()
+    index.add(packages(8))
+    found = index.candidates(query("", target, wants=["lib1"]))
+    assert [pkg.name for pkg in found] == ["Straße-1", "Straße-5"]
+    assert not query("", target).ranked()
+
+
+def test_compact():
+    index = SearchIndex()
+    index.HOLES_MIN = 10
+    olds = packages(40)
+    index.add(olds)
+    index.add(packages(5, 40), publish=False)  # loaded, not yet in model
+    index.remove(olds[:12])  # 12 holes > 10 and > 45 / 4: compacted
+    assert index.holes == 0 and len(index.packages) == 33
+    assert all(pkg is not None for pkg in index.packages)
+    assert index.size == 28
+    assert len(index.names.postings["tra"]) == 33
+    assert len(index.candidates(query("tra", wants=["lib0"]))) == 7
+    maintained = {f"Straße-{i}" for i in range(12, 40, 3)}
+    assert names(index.by_maintainer("user0")) == maintained
+    index.publish(5)
+    assert names(index.candidates(query("ße-44"))) == {"Straße-44"}
+
+
+@pytest.mark.parametrize("compact", (False, True))
+def test_lazy_build(compact):
+    index = SearchIndex()
+    olds = packages(10)
+    index.add(olds)
+    assert not index.lazy  # loader indexes only names and maintainers
+    news = packages(2, 10)
+
+    class Building(WordIndex):
+        def add(self, position, pkg):
+            if not index.positions.get(news[0]):  # packages changed while building
+                index.remove(olds[:1])
+                index.add(news)
+                if compact:
+                    index.compact()  # positions changed: built again
+            super().add(position, pkg)
+
+    index.LAZY = {**SearchIndex.LAZY, "words": Building}
+    found = index.candidates(query("strase", FUZZY))
+    assert names(found) == {f"Straße-{i}" for i in range(1, 12)}
+    assert list(index.lazy) == ["words"]
+    index.update(olds[1:2])
+    index.add(packages(1, 12))
+    assert len(index.fuzzy("strase")) == 12  # lazy index is now kept updated
+
+
+def test_search_while_loading():
+    index = SearchIndex()
+    loaded = packages(3000)
+    loader = threading.Thread(
+        target=lambda: [
+            index.add(loaded[i : i + 100], publish=False) for i in range(0, 3000, 100)
+        ]
+    )
+    loader.start()
+    while loader.is_alive():
+        found = index.candidates(query("tra", wants=["lib1"]))
+        index.fuzzy("strase")
+        assert found == [] and not index.maintainer_counts()  # nothing published
+        index.publish(0)
+    loader.join()
+    index.publish(3000)
+    assert len(index.candidates(query("tra", wants=["lib1"]))) == 750
+    assert index.maintainer_counts() == {"user0": 1000, "user1": 1000, "user2": 1000}
+
+
+def test_update_renamed():
+    index = SearchIndex()
+    olds = packages(3)
+    index.add(olds)
+    assert "words" not in index.lazy  # built by first fuzzy search, not by add()
+    assert index.fuzzy("strase") == {0, 1, 2}
+    renamed = Package.from_records([{"ID": 2, "Name": "other", "Maintainer": "me"}])
+    olds[1].update(renamed[0])  # as applyChanges: package updated, then index
+    index.update([olds[1]])
+    assert 1 not in index.lazy["words"].positions["strasse"]
+    assert index.fuzzy("strase") == {0, 2}
+    assert names(index.candidates(query("othr", FUZZY))) == {"other"}
+    assert "user1" not in index.maintainers
+    assert names(index.by_maintainer("me")) == {"other"}
+
+
+def test_fuzzy_rank():
+    found = Package.from_records(
+        [
+            {"ID": 1, "Name": "unrelated", "Popularity": 9},
+            {"ID": 2, "Name": "strase", "Popularity": 5},
+            {"ID": 3, "Name": "straße", "Popularity": 1},
+            {"ID": 4, "Name": "strasse-bin", "Popularity": 2},
+        ]
+    )
+    ranked = sorted(found, key=fuzzy_rank("strasse"))
+    assert [pkg.name for pkg in ranked] == ["strasse-bin", "straße", "strase", "unrelated"]
+
+
+def test_ranked():
+    datas = [
+        {"ID": 1, "Name": "editor", "Description": "text editor, small editor"},
+        {"ID": 2, "Name": "vim-plugin", "Description": "plugin for the editor"},
+        {"ID": 3, "Name": "player", "Description": "music player"},
+    ]
+    fresh = SearchIndex()
+    fresh.add(Package.from_records(datas))
+    index = SearchIndex()
+    index.add(olds := Package.from_records(datas))
+    for _ in range(5):  # holes of updates are not in document frequencies
+        index.update(olds[1:])
+    counted = index.require("terms").top(["editor", "plugin"], 10)
+    assert len(counted) == 2
+    assert [pkg.name for pkg in index.ranked("editor plugin", 10)] == [
+        pkg.name for pkg in fresh.ranked("editor plugin", 10)
+    ]
+    index.add(Package.from_records([{"ID": 4, "Name": "editor"}]), publish=False)
+    assert "editor" in {pkg.name for pkg in index.ranked("editor", 10)}
+    assert len(index.ranked("editor", 10)) == 2  # not published: not found
+
+
+def test_query_cache_threads():
+    cache = QueryCache()
+    one = query("text")
+    guis = []
+
+    class Racing(OrderedDict):
+        def get(self, key, default=None):
+            result = super().get(key, default)
+            # gui thread clears cache while get() runs in a search thread
+            guis.append(gui := threading.Thread(target=cache.clear))
+            gui.start()
+            gui.join(0.2)
+            return result
+
+    cache.results = Racing()
+    cache.put(one, [])
+    assert cache.get(one) == []
+    guis[0].join()
+    assert cache.get(one) is None  # cleared after get()
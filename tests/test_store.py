@@ -0,0 +1,73 @@
+"""
+columnar store of packages
+"""
+from aurkonsult import core
+from aurkonsult.core import Package
+from aurkonsult.store import PackageStore
+
+
+def records(count: int) -> list[dict]:
+    return [
+        {"ID": i + 1, "Name": f"pkg{i}", "Depends": [f"lib{i}", "glibc"]}
+        for i in range(count)
+    ]
+
+
+def test_set_list_any_row():
+    packages = Package.from_records(records(5))
+    packages[1].depends = ["a", "b", "c", "d"]  # longer: appended, row repointed
+    packages[2].depends = ["x"]  # shorter: in place
+    packages[4].depends = ["y", "z", "w"]  # last row: grows at end
+    packages[0].depends = []
+    assert [pkg.depends for pkg in packages] == [
+        [],
+        ["a", "b", "c", "d"],
+        ["x"],
+        ["lib3", "glibc"],
+        ["y", "z", "w"],
+    ]
+    store = packages[0]._store
+    assert store.depends_offsets[-1] == len(store.depends)
+    # offsets still valid for a copy in another store
+    copy = PackageStore.from_columns(store.columns())
+    other = PackageStore()
+    other.extend(copy)
+    assert [other.get_list(row, "depends") for row in range(5)] == [
+        pkg.depends for pkg in packages
+    ]
+
+
+def test_detached_packages_share_store():
+    first, second = Package(), Package()
+    assert first._store is second._store is core.DETACHED
+    first.depends = ["a"]
+    second.depends = ["b", "c"]
+    first.depends = ["d", "e", "f"]
+    assert (first.depends, second.depends) == (["d", "e", "f"], ["b", "c"])
+
+
+def test_changed_rows():
+    olds = Package.from_records(records(50))
+    datas = records(50)[::-1]  # other rows, other string pool
+    datas[3]["Name"] = "renamed"
+    datas[10]["Depends"] = ["lib39", "glibc", "new"]  # longer list
+    datas[11]["Depends"] = ["glibc", "lib38"]  # other order
+    datas[12]["Maintainer"] = "someone"
+    datas[13]["Popularity"] = 0.5
+    news = Package.from_records(datas)
+    news[20].set_version_local("1.0-1")  # local values are not compared
+    pairs = [(old, new) for old in olds for new in news if old.id == new.id]
+    found = olds[0]._store.changed_rows(
+        [old._row for old, _ in pairs],
+        news[0]._store,
+        [new._row for _, new in pairs],
+        core.LOCAL_FIELDS,
+    )
+    assert found == [
+        i for i, (old, new) in enumerate(pairs) if old.aur_values() != new.aur_values()
+    ]
+    names = {pairs[i][1].name for i in found}
+    assert names == {"renamed", "pkg39", "pkg38", "pkg37", "pkg36"}
+    store = olds[0]._store
+    assert store.changed_rows([1, 2], store, [1, 2]) == []
+    assert store.changed_rows([1, 2], store, [2, 2]) == [0]